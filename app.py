@@ -6,17 +6,25 @@ except ImportError:
     pass
 
 from flask import Flask, render_template, jsonify, request
+from flask.json.provider import JSONProvider
 from inverter import DeyeInverter, BatterySampler, InverterConfig
 from telegram_bot import TelegramBot
 from outage_providers import OutageSchedulePoller, create_outage_provider
 from update_manager import get_current_version, UpdatePoller, UpdateManager
+import bisect
+from collections import deque
 from datetime import datetime, date
+import atexit
 import os
 import json
 import logging
+import queue
+import signal
 import subprocess
+import sys
 import threading
 import time
+import orjson
 import requests
 
 WEATHER_LATITUDE = os.environ.get("WEATHER_LATITUDE", "0.0")
@@ -131,8 +139,7 @@ class InverterPoller:
         try:
             with self._lock:
                 data = dict(self._cache)
-            with open(self.cache_file, "w") as f:
-                json.dump(data, f)
+            atomic_write(self.cache_file, json.dumps(data).encode())
         except Exception:
             logger.exception("Failed to save inverter cache")
 
@@ -166,9 +173,10 @@ class InverterPoller:
             if inverter_config.has_generator and "generator_power" in result:
                 track_generator_runtime(result["generator_power"])
 
-            # Record phase sample for analytics (only for 3-phase)
+            # Record phase sample for analytics (only for 3-phase);
+            # the stats/history writes happen on the phase sample worker
             if "load_l1" in result and inverter_config.phases == 3:
-                record_phase_sample(
+                enqueue_phase_sample(
                     result.get("load_l1", 0),
                     result.get("load_l2", 0),
                     result.get("load_l3", 0),
@@ -191,7 +199,30 @@ class InverterPoller:
         t.start()
 
 
+class OrjsonProvider(JSONProvider):
+    """Flask JSON provider backed by orjson.
+
+    Keys are emitted in insertion order and without pretty-printing, so
+    jsonify() responses skip the sort/indent work of the default provider.
+    """
+
+    option = orjson.OPT_NON_STR_KEYS
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, option=self.option).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(
+            orjson.dumps(obj, option=self.option), mimetype="application/json"
+        )
+
+
 app = Flask(__name__)
+app.json = OrjsonProvider(app)
 
 # Configuration - can be overridden with environment variables
 INVERTER_IP = os.environ.get("INVERTER_IP", "0.0.0.0")
@@ -203,6 +234,11 @@ GRID_DAILY_LOG_FILE = os.environ.get("GRID_DAILY_LOG_FILE", "grid_daily_log.json
 GENERATOR_LOG_FILE = os.environ.get("GENERATOR_LOG_FILE", "generator_log.json")
 GENERATOR_FUEL_RATE = float(os.environ.get("GENERATOR_FUEL_RATE", "0"))
 GENERATOR_OIL_CHANGE_DATE = os.environ.get("GENERATOR_OIL_CHANGE_DATE", "")
+PHASE_FLUSH_INTERVAL = int(os.environ.get("PHASE_FLUSH_INTERVAL", "60"))  # seconds
+PHASE_HISTORY_MAX_POINTS = 2880  # one day at one point per 30 s
+PHASE_HISTORY_DAYS = 7
+# Build services but don't start their threads (set by the test suite)
+DISABLE_POLLER_THREADS = os.environ.get("DEYE_DISABLE_POLLER_THREADS", "").lower() in ("1", "true", "yes")
 
 
 def build_inverter_config(inv):
@@ -261,7 +297,6 @@ def init_services():
     inverter.config = inverter_config
 
     battery_sampler = BatterySampler(inverter, interval=30)
-    battery_sampler.start()
 
     # Outage schedule provider
     outage_provider_name = os.environ.get("OUTAGE_PROVIDER", "lvivoblenergo")
@@ -274,50 +309,143 @@ def init_services():
     )
     if outage_prov is not None:
         outage_poller = OutageSchedulePoller(provider=outage_prov)
-        outage_poller.start()
     else:
         logger.info("Outage schedule disabled (OUTAGE_PROVIDER=none)")
 
     weather_poller = WeatherPoller()
-    weather_poller.start()
     inverter_poller = InverterPoller(inverter, battery_sampler,
                                     cache_file=INVERTER_CACHE_FILE)
-    inverter_poller.start()
 
     # OTA update system
     github_repo = os.environ.get("GITHUB_REPO", "ivanursul/deye-dashboard")
     update_check_interval = int(os.environ.get("UPDATE_CHECK_INTERVAL", "600"))
     update_poller = UpdatePoller(repo=github_repo, poll_interval=update_check_interval)
     update_manager = UpdateManager()
-    update_poller.start()
 
+    if DISABLE_POLLER_THREADS:
+        logger.info("Background threads disabled (DEYE_DISABLE_POLLER_THREADS)")
+        return
+    for service in (battery_sampler, outage_poller, weather_poller,
+                    inverter_poller, update_poller):
+        if service is not None:
+            service.start()
+    start_phase_sample_worker()
 
-if _configured:
-    init_services()
 
-# Phase data collection
+# Phase data collection (time.monotonic() values, immune to wall-clock jumps)
 last_sample_time = None
 last_history_save = None
 phase_accumulator = {"l1": 0, "l2": 0, "l3": 0}
 
+# In-memory phase stats/history, loaded lazily on first access.
+# Stats are flushed to disk on a timer; history points are appended to a
+# JSONL journal and only rewritten as a full JSON snapshot on day rotation.
+_phase_lock = threading.RLock()
+_phase_stats_cache = None
+_phase_stats_dirty = False
+_phase_stats_path = None  # file the pending flush writes to, bound when stats are saved
+_phase_history_cache = None  # {date: deque of points}
+# Date keys of the two caches above, kept sorted as days are added/rotated
+_phase_stats_dates = []
+_phase_history_dates = []
+_phase_flush_timer = None
+
+# In-memory outage history (last OUTAGE_HISTORY_MAX_EVENTS), loaded lazily
+OUTAGE_HISTORY_MAX_EVENTS = 100
+_outage_lock = threading.RLock()
+_outage_history_cache = None
+
+
+# (date ordinal, "YYYY-MM-DD") for the most recent day seen by today_str()
+_today_cache = (None, None)
+
+
+def today_str(now):
+    """Return now as "YYYY-MM-DD", reusing the cached string until the date changes."""
+    global _today_cache
+    ordinal = now.toordinal()
+    if _today_cache[0] != ordinal:
+        _today_cache = (ordinal, now.strftime("%Y-%m-%d"))
+    return _today_cache[1]
+
+
+def _load_json_file(path, default):
+    """Load a JSON file with orjson, returning default if it doesn't exist."""
+    if os.path.exists(path):
+        with open(path, "rb") as f:
+            return orjson.loads(f.read())
+    return default
+
+
+def atomic_write(path, data):
+    """Write bytes to path via a fsynced temp file + rename.
+
+    A crash mid-write leaves either the old or the new file, never a
+    truncated one.
+    """
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def _save_json_file(path, obj):
+    """Save obj to a JSON file as compact JSON (use dump_json.py to read it)."""
+    atomic_write(path, orjson.dumps(obj))
+    with _json_cache_lock:
+        if path in _json_cache:
+            # Write-through so the next cached_json() call doesn't re-parse
+            _json_cache[path] = (_file_signature(path), obj)
+
+
+# Parsed JSON files keyed by path: {path: ((mtime_ns, size), obj)}
+_json_cache = {}
+_json_cache_lock = threading.Lock()
+
+
+def _file_signature(path):
+    """Return (mtime_ns, size) for path, or None if it doesn't exist."""
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+def cached_json(path, default):
+    """Load a JSON file, re-parsing it only when its mtime or size changed.
+
+    The returned object is shared between callers, so writers should hand
+    it back through _save_json_file() rather than mutate it and walk away.
+    """
+    signature = _file_signature(path)
+    if signature is None:
+        return default
+    with _json_cache_lock:
+        entry = _json_cache.get(path)
+        if entry is not None and entry[0] == signature:
+            return entry[1]
+    obj = _load_json_file(path, default)
+    with _json_cache_lock:
+        _json_cache[path] = (signature, obj)
+    return obj
+
 
 def load_grid_daily_log():
     """Load grid daily import log from file."""
-    if os.path.exists(GRID_DAILY_LOG_FILE):
-        with open(GRID_DAILY_LOG_FILE, "r") as f:
-            return json.load(f)
-    return {}
+    return cached_json(GRID_DAILY_LOG_FILE, {})
 
 
 def save_grid_daily_log(log):
     """Save grid daily import log to file."""
-    with open(GRID_DAILY_LOG_FILE, "w") as f:
-        json.dump(log, f, indent=2)
+    _save_json_file(GRID_DAILY_LOG_FILE, log)
 
 
 def record_grid_daily_import(daily_kwh):
     """Record today's daily grid import value, overwriting previous entry."""
-    today = datetime.now().strftime("%Y-%m-%d")
+    today = today_str(datetime.now())
     log = load_grid_daily_log()
     log[today] = daily_kwh
     # Keep only last 90 days
@@ -330,29 +458,32 @@ def record_grid_daily_import(daily_kwh):
 
 def load_generator_log():
     """Load generator runtime log from file."""
-    if os.path.exists(GENERATOR_LOG_FILE):
-        with open(GENERATOR_LOG_FILE, "r") as f:
-            return json.load(f)
-    return {}
+    return cached_json(GENERATOR_LOG_FILE, {})
 
 
 def save_generator_log(log):
     """Save generator runtime log to file."""
-    with open(GENERATOR_LOG_FILE, "w") as f:
-        json.dump(log, f, indent=2)
+    _save_json_file(GENERATOR_LOG_FILE, log)
 
 
-# Generator runtime tracking state
+# Generator runtime tracking state (session start is a time.monotonic() value)
 generator_last_running = None
 generator_session_start = None
 
 
+def _generator_session_seconds():
+    """Seconds the current generator session has been running, or 0."""
+    if generator_session_start is None:
+        return 0
+    return time.monotonic() - generator_session_start
+
+
 def track_generator_runtime(generator_power):
     """Track generator runtime based on power readings."""
     global generator_last_running, generator_session_start
 
     now = datetime.now()
-    today = now.strftime("%Y-%m-%d")
+    today = today_str(now)
     running = generator_power > 0
 
     log = load_generator_log()
@@ -362,16 +493,15 @@ def track_generator_runtime(generator_power):
 
     if running and not generator_last_running:
         # Transition: off → on — start new session
-        generator_session_start = now
+        generator_session_start = time.monotonic()
         log[today]["sessions"].append({
             "start": now.strftime("%H:%M:%S"),
             "end": None,
         })
     elif not running and generator_last_running:
         # Transition: on → off — close session
-        if generator_session_start:
-            elapsed = (now - generator_session_start).total_seconds()
-            log[today]["runtime_seconds"] += int(elapsed)
+        if generator_session_start is not None:
+            log[today]["runtime_seconds"] += int(_generator_session_seconds())
             # Close the last open session
             if log[today]["sessions"] and log[today]["sessions"][-1]["end"] is None:
                 log[today]["sessions"][-1]["end"] = now.strftime("%H:%M:%S")
@@ -389,124 +519,271 @@ def track_generator_runtime(generator_power):
 
 
 def load_outage_history():
-    """Load outage history from file."""
-    if os.path.exists(OUTAGE_HISTORY_FILE):
-        with open(OUTAGE_HISTORY_FILE, "r") as f:
-            return json.load(f)
-    return []
+    """Return the in-memory outage history deque, loading from file on first use."""
+    global _outage_history_cache
+    with _outage_lock:
+        if _outage_history_cache is None:
+            _outage_history_cache = deque(
+                _load_json_file(OUTAGE_HISTORY_FILE, []),
+                maxlen=OUTAGE_HISTORY_MAX_EVENTS,
+            )
+        return _outage_history_cache
 
 
 def save_outage_history(history):
-    """Save outage history to file."""
-    with open(OUTAGE_HISTORY_FILE, "w") as f:
-        json.dump(history, f, indent=2)
+    """Replace the outage history and write it to file."""
+    global _outage_history_cache
+    with _outage_lock:
+        if history is not _outage_history_cache:
+            _outage_history_cache = deque(history, maxlen=OUTAGE_HISTORY_MAX_EVENTS)
+        _save_json_file(OUTAGE_HISTORY_FILE, list(_outage_history_cache))
 
 
 def load_phase_stats():
-    """Load phase statistics from file."""
-    if os.path.exists(PHASE_STATS_FILE):
-        with open(PHASE_STATS_FILE, "r") as f:
-            return json.load(f)
-    return {}
+    """Return the in-memory phase statistics, loading from file on first use."""
+    global _phase_stats_cache, _phase_stats_dates
+    with _phase_lock:
+        if _phase_stats_cache is None:
+            _phase_stats_cache = cached_json(PHASE_STATS_FILE, {})
+            _phase_stats_dates = sorted(_phase_stats_cache)
+        return _phase_stats_cache
 
 
 def save_phase_stats(stats):
-    """Save phase statistics to file."""
-    with open(PHASE_STATS_FILE, "w") as f:
-        json.dump(stats, f, indent=2)
+    """Replace the in-memory phase statistics and schedule a flush to file."""
+    global _phase_stats_cache, _phase_stats_dirty, _phase_stats_dates, _phase_stats_path
+    with _phase_lock:
+        if stats is not _phase_stats_cache:
+            _phase_stats_dates = sorted(stats)
+        _phase_stats_cache = stats
+        _phase_stats_dirty = True
+        _phase_stats_path = PHASE_STATS_FILE
+        _schedule_phase_flush()
+
+
+def _phase_history_journal():
+    """Path of the JSONL journal that sits next to PHASE_HISTORY_FILE."""
+    return os.path.splitext(PHASE_HISTORY_FILE)[0] + ".jsonl"
+
+
+def _read_phase_history():
+    """Read the phase history snapshot and replay the journal on top of it."""
+    history = {
+        day: deque(points, maxlen=PHASE_HISTORY_MAX_POINTS)
+        for day, points in _load_json_file(PHASE_HISTORY_FILE, {}).items()
+    }
+    journal = _phase_history_journal()
+    if os.path.exists(journal):
+        with open(journal, "rb") as f:
+            for line in f:
+                try:
+                    point = orjson.loads(line)
+                except orjson.JSONDecodeError:
+                    continue  # partial last line after a crash
+                day = point.pop("date")
+                if day not in history:
+                    history[day] = deque(maxlen=PHASE_HISTORY_MAX_POINTS)
+                history[day].append(point)
+    return history
+
+
+def _write_phase_history_snapshot():
+    """Rewrite the full history file and empty the journal (caller must hold _phase_lock)."""
+    _save_json_file(PHASE_HISTORY_FILE, {
+        day: list(points) for day, points in _phase_history_cache.items()
+    })
+    open(_phase_history_journal(), "wb").close()
 
 
 def load_phase_history():
-    """Load phase time-series history from file."""
-    if os.path.exists(PHASE_HISTORY_FILE):
-        with open(PHASE_HISTORY_FILE, "r") as f:
-            return json.load(f)
-    return {}
+    """Return the in-memory phase history ({date: deque}), loading from file on first use."""
+    global _phase_history_cache, _phase_history_dates
+    with _phase_lock:
+        if _phase_history_cache is None:
+            _phase_history_cache = _read_phase_history()
+            _phase_history_dates = sorted(_phase_history_cache)
+        return _phase_history_cache
 
 
 def save_phase_history(history):
-    """Save phase time-series history to file."""
-    with open(PHASE_HISTORY_FILE, "w") as f:
-        json.dump(history, f, indent=2)
+    """Replace the phase history and write it to file."""
+    global _phase_history_cache, _phase_history_dates
+    with _phase_lock:
+        _phase_history_cache = {
+            day: deque(points, maxlen=PHASE_HISTORY_MAX_POINTS)
+            for day, points in history.items()
+        }
+        _phase_history_dates = sorted(_phase_history_cache)
+        _write_phase_history_snapshot()
+
+
+def _schedule_phase_flush():
+    """Start the flush timer if one isn't pending (caller must hold _phase_lock)."""
+    global _phase_flush_timer
+    if _phase_flush_timer is None:
+        _phase_flush_timer = threading.Timer(PHASE_FLUSH_INTERVAL, flush_phase_data)
+        _phase_flush_timer.daemon = True
+        _phase_flush_timer.start()
+
+
+def flush_phase_data():
+    """Write the phase stats to file if they changed since the last flush."""
+    global _phase_flush_timer, _phase_stats_dirty
+    with _phase_lock:
+        _phase_flush_timer = None
+        if not _phase_stats_dirty:
+            return
+        try:
+            _save_json_file(_phase_stats_path or PHASE_STATS_FILE, _phase_stats_cache)
+            _phase_stats_dirty = False
+        except Exception:
+            logger.exception("Failed to flush phase stats")
+
+
+atexit.register(flush_phase_data)
+
+
+def _phase_day_summary(day, data):
+    """Build the /api/phase-stats entry (kWh totals, maxes, shares) for one day."""
+    total_wh = data["l1_wh"] + data["l2_wh"] + data["l3_wh"]
+    return {
+        "date": day,
+        "l1_kwh": round(data["l1_wh"] / 1000, 2),
+        "l2_kwh": round(data["l2_wh"] / 1000, 2),
+        "l3_kwh": round(data["l3_wh"] / 1000, 2),
+        "total_kwh": round(total_wh / 1000, 2),
+        "l1_max": data["l1_max"],
+        "l2_max": data["l2_max"],
+        "l3_max": data["l3_max"],
+        "l1_pct": round(data["l1_wh"] / total_wh * 100, 1) if total_wh > 0 else 0,
+        "l2_pct": round(data["l2_wh"] / total_wh * 100, 1) if total_wh > 0 else 0,
+        "l3_pct": round(data["l3_wh"] / total_wh * 100, 1) if total_wh > 0 else 0,
+    }
+
 
+def record_phase_sample(load_l1, load_l2, load_l3, now=None, now_m=None):
+    """Record a phase power sample and accumulate energy.
 
-def record_phase_sample(load_l1, load_l2, load_l3):
-    """Record a phase power sample and accumulate energy."""
+    now/now_m (wall clock and time.monotonic()) default to the current time;
+    the phase sample worker passes the values captured at enqueue time.
+    """
     global last_sample_time, last_history_save, phase_accumulator
 
-    now = datetime.now()
-    today = now.strftime("%Y-%m-%d")
+    if now is None:
+        now = datetime.now()
+    if now_m is None:
+        now_m = time.monotonic()
+    today = today_str(now)
+
+    # Hold the (re-entrant) phase lock while mutating the shared stats so
+    # request threads never see a half-updated day
+    with _phase_lock:
+        stats = load_phase_stats()
+
+        # Initialize today's entry if needed
+        if today not in stats:
+            stats[today] = {
+                "l1_wh": 0,
+                "l2_wh": 0,
+                "l3_wh": 0,
+                "samples": 0,
+                "l1_max": 0,
+                "l2_max": 0,
+                "l3_max": 0
+            }
+            # Only one new date can appear per call, so rotate just here:
+            # keep the last 30 days by dropping the oldest
+            bisect.insort(_phase_stats_dates, today)
+            while len(_phase_stats_dates) > 30:
+                del stats[_phase_stats_dates.pop(0)]
+
+        day = stats[today]
+
+        # Calculate energy (Wh) from power (W) and time interval;
+        # only accumulate if interval is reasonable (< 5 minutes)
+        interval_hours = 0
+        if last_sample_time is not None:
+            interval_hours = (now_m - last_sample_time) / 3600
+            if interval_hours >= 0.1:
+                interval_hours = 0
+
+        # Accumulate energy and update max values per phase
+        for phase, load in (("l1", load_l1), ("l2", load_l2), ("l3", load_l3)):
+            if interval_hours:
+                day[phase + "_wh"] += load * interval_hours
+            if load > day[phase + "_max"]:
+                day[phase + "_max"] = load
+        day["samples"] += 1
+        day["summary"] = _phase_day_summary(today, day)
+
+        last_sample_time = now_m
+
+        save_phase_stats(stats)
 
-    # Load existing stats
-    stats = load_phase_stats()
+    # Save to time-series history (every 30 seconds for smooth charts)
+    if last_history_save is None or now_m - last_history_save >= 30:
+        save_to_phase_history(now, load_l1, load_l2, load_l3)
+        last_history_save = now_m
 
-    # Initialize today's entry if needed
-    if today not in stats:
-        stats[today] = {
-            "l1_wh": 0,
-            "l2_wh": 0,
-            "l3_wh": 0,
-            "samples": 0,
-            "l1_max": 0,
-            "l2_max": 0,
-            "l3_max": 0
-        }
 
-    # Calculate energy (Wh) from power (W) and time interval
-    if last_sample_time:
-        interval_hours = (now - last_sample_time).total_seconds() / 3600
+# Bounded hand-off from the inverter poller to the phase sample worker, so
+# stats/history disk I/O never delays the next Modbus poll
+_phase_sample_queue = queue.Queue(maxsize=256)
 
-        # Only accumulate if interval is reasonable (< 5 minutes)
-        if interval_hours < 0.1:
-            stats[today]["l1_wh"] += load_l1 * interval_hours
-            stats[today]["l2_wh"] += load_l2 * interval_hours
-            stats[today]["l3_wh"] += load_l3 * interval_hours
 
-    # Update max values
-    stats[today]["l1_max"] = max(stats[today]["l1_max"], load_l1)
-    stats[today]["l2_max"] = max(stats[today]["l2_max"], load_l2)
-    stats[today]["l3_max"] = max(stats[today]["l3_max"], load_l3)
-    stats[today]["samples"] += 1
+def enqueue_phase_sample(load_l1, load_l2, load_l3):
+    """Queue a phase sample for recording; drops the sample if the queue is full."""
+    try:
+        _phase_sample_queue.put_nowait(
+            (datetime.now(), time.monotonic(), load_l1, load_l2, load_l3)
+        )
+    except queue.Full:
+        logger.warning("Phase sample queue full, dropping sample")
 
-    last_sample_time = now
 
-    # Keep only last 30 days
-    sorted_dates = sorted(stats.keys(), reverse=True)
-    if len(sorted_dates) > 30:
-        for old_date in sorted_dates[30:]:
-            del stats[old_date]
+def _phase_sample_worker():
+    """Record queued phase samples until the process exits."""
+    while True:
+        now, now_m, load_l1, load_l2, load_l3 = _phase_sample_queue.get()
+        try:
+            record_phase_sample(load_l1, load_l2, load_l3, now=now, now_m=now_m)
+        except Exception:
+            logger.exception("Error recording phase sample")
 
-    save_phase_stats(stats)
 
-    # Save to time-series history (every 30 seconds for smooth charts)
-    if last_history_save is None or (now - last_history_save).total_seconds() >= 30:
-        save_to_phase_history(now, load_l1, load_l2, load_l3)
-        last_history_save = now
+def start_phase_sample_worker():
+    t = threading.Thread(target=_phase_sample_worker, daemon=True)
+    t.start()
 
 
 def save_to_phase_history(timestamp, l1, l2, l3):
     """Save a data point to the time-series history."""
-    history = load_phase_history()
-    today = timestamp.strftime("%Y-%m-%d")
-    time_str = timestamp.strftime("%H:%M:%S")
-
-    if today not in history:
-        history[today] = []
-
-    history[today].append({
-        "time": time_str,
+    today = today_str(timestamp)
+    point = {
+        "time": timestamp.strftime("%H:%M:%S"),
         "l1": l1,
         "l2": l2,
         "l3": l3
-    })
-
-    # Keep only last 7 days of history
-    sorted_dates = sorted(history.keys(), reverse=True)
-    if len(sorted_dates) > 7:
-        for old_date in sorted_dates[7:]:
-            del history[old_date]
+    }
 
-    save_phase_history(history)
+    # Load under the lock too, so a concurrent clear can't swap the cache (and
+    # the date index) between fetching it and updating it
+    with _phase_lock:
+        history = load_phase_history()
+        new_day = today not in history
+        if new_day:
+            history[today] = deque(maxlen=PHASE_HISTORY_MAX_POINTS)
+            bisect.insort(_phase_history_dates, today)
+        history[today].append(point)
+
+        if new_day or len(history) > PHASE_HISTORY_DAYS:
+            # Rotation boundary: keep only the last 7 days and rewrite in full
+            while len(_phase_history_dates) > PHASE_HISTORY_DAYS:
+                del history[_phase_history_dates.pop(0)]
+            _write_phase_history_snapshot()
+        else:
+            with open(_phase_history_journal(), "ab") as f:
+                f.write(orjson.dumps({"date": today, **point}) + b"\n")
 
 
 @app.after_request
@@ -543,24 +820,17 @@ def get_data():
 def get_phase_stats():
     """Get phase statistics."""
     stats = load_phase_stats()
+    with _phase_lock:
+        # The sorted date index tracks the in-memory cache only
+        dates = _phase_stats_dates if stats is _phase_stats_cache else sorted(stats)
+        days = dates[:-15:-1]  # Last 14 days, newest first
 
-    # Calculate daily totals and format for frontend
+    # Summaries are precomputed by record_phase_sample; older entries
+    # loaded from file may not have one yet
     result = []
-    for day, data in sorted(stats.items(), reverse=True)[:14]:  # Last 14 days
-        total_wh = data["l1_wh"] + data["l2_wh"] + data["l3_wh"]
-        result.append({
-            "date": day,
-            "l1_kwh": round(data["l1_wh"] / 1000, 2),
-            "l2_kwh": round(data["l2_wh"] / 1000, 2),
-            "l3_kwh": round(data["l3_wh"] / 1000, 2),
-            "total_kwh": round(total_wh / 1000, 2),
-            "l1_max": data["l1_max"],
-            "l2_max": data["l2_max"],
-            "l3_max": data["l3_max"],
-            "l1_pct": round(data["l1_wh"] / total_wh * 100, 1) if total_wh > 0 else 0,
-            "l2_pct": round(data["l2_wh"] / total_wh * 100, 1) if total_wh > 0 else 0,
-            "l3_pct": round(data["l3_wh"] / total_wh * 100, 1) if total_wh > 0 else 0,
-        })
+    for day in days:
+        data = stats[day]
+        result.append(data.get("summary") or _phase_day_summary(day, data))
 
     return jsonify(result)
 
@@ -569,20 +839,20 @@ def get_phase_stats():
 def get_phase_history():
     """Get phase time-series data for charting."""
     history = load_phase_history()
-    date_param = request.args.get("date", datetime.now().strftime("%Y-%m-%d"))
+    date_param = request.args.get("date", today_str(datetime.now()))
 
-    if date_param in history:
-        return jsonify({
-            "date": date_param,
-            "data": history[date_param],
-            "available_dates": sorted(history.keys(), reverse=True)
-        })
-    else:
-        return jsonify({
-            "date": date_param,
-            "data": [],
-            "available_dates": sorted(history.keys(), reverse=True)
-        })
+    with _phase_lock:
+        data = list(history.get(date_param, ()))
+        if history is _phase_history_cache:
+            available_dates = _phase_history_dates[::-1]
+        else:
+            available_dates = sorted(history, reverse=True)
+
+    return jsonify({
+        "date": date_param,
+        "data": data,
+        "available_dates": available_dates
+    })
 
 
 @app.route("/api/phase-stats/clear", methods=["POST"])
@@ -617,7 +887,8 @@ def get_outage_schedule():
 @app.route("/api/outages", methods=["GET"])
 def get_outages():
     """Get outage history."""
-    history = load_outage_history()
+    with _outage_lock:
+        history = list(load_outage_history())
     return jsonify(history)
 
 
@@ -625,34 +896,31 @@ def get_outages():
 def add_outage():
     """Add a new outage event."""
     data = request.json
-    history = load_outage_history()
-
-    event = {
-        "id": len(history) + 1,
-        "type": data.get("type"),  # "start" or "end"
-        "timestamp": data.get("timestamp"),
-        "voltage": data.get("voltage", 0)
-    }
+    with _outage_lock:
+        history = load_outage_history()
+
+        event = {
+            "id": len(history) + 1,
+            "type": data.get("type"),  # "start" or "end"
+            "timestamp": data.get("timestamp"),
+            "voltage": data.get("voltage", 0)
+        }
 
-    # If this is an "end" event, calculate duration
-    if event["type"] == "end" and history:
-        # Find the last "start" event
-        for i in range(len(history) - 1, -1, -1):
-            if history[i]["type"] == "start" and "duration" not in history[i]:
-                start_time = datetime.fromisoformat(history[i]["timestamp"])
-                end_time = datetime.fromisoformat(event["timestamp"])
-                duration = (end_time - start_time).total_seconds()
-                history[i]["duration"] = duration
-                history[i]["end_timestamp"] = event["timestamp"]
-                break
-
-    history.append(event)
-
-    # Keep only last 100 events
-    if len(history) > 100:
-        history = history[-100:]
-
-    save_outage_history(history)
+        # If this is an "end" event, calculate duration
+        if event["type"] == "end" and history:
+            # Find the last "start" event
+            for i in range(len(history) - 1, -1, -1):
+                if history[i]["type"] == "start" and "duration" not in history[i]:
+                    start_time = datetime.fromisoformat(history[i]["timestamp"])
+                    end_time = datetime.fromisoformat(event["timestamp"])
+                    duration = (end_time - start_time).total_seconds()
+                    history[i]["duration"] = duration
+                    history[i]["end_timestamp"] = event["timestamp"]
+                    break
+
+        # The deque drops the oldest event past OUTAGE_HISTORY_MAX_EVENTS
+        history.append(event)
+        save_outage_history(history)
     return jsonify({"status": "ok"})
 
 
@@ -681,8 +949,11 @@ def get_generator():
         return jsonify({"enabled": False})
 
     now = datetime.now()
-    today = now.strftime("%Y-%m-%d")
+    today = today_str(now)
     log = load_generator_log()
+    # The poller thread adds and expires days in this shared dict; iterate a
+    # snapshot so a concurrent update can't break the loops below
+    entries = list(log.items())
 
     # Current power from inverter poller
     inv_data = inverter_poller.data
@@ -692,18 +963,18 @@ def get_generator():
     # Today's runtime (account for currently-running session)
     today_entry = log.get(today, {"runtime_seconds": 0, "sessions": []})
     today_seconds = today_entry["runtime_seconds"]
-    if running and generator_session_start:
-        today_seconds += int((now - generator_session_start).total_seconds())
+    if running:
+        today_seconds += int(_generator_session_seconds())
     today_hours = round(today_seconds / 3600, 2)
 
     # Monthly runtime
     month_prefix = now.strftime("%Y-%m")
     monthly_seconds = 0
-    for day_key, day_data in log.items():
+    for day_key, day_data in entries:
         if day_key.startswith(month_prefix):
             monthly_seconds += day_data.get("runtime_seconds", 0)
-    if running and generator_session_start:
-        monthly_seconds += int((now - generator_session_start).total_seconds())
+    if running:
+        monthly_seconds += int(_generator_session_seconds())
     monthly_hours = round(monthly_seconds / 3600, 2)
 
     result = {
@@ -732,11 +1003,11 @@ def get_generator():
             oil_date = datetime.strptime(GENERATOR_OIL_CHANGE_DATE, "%Y-%m-%d")
             # Sum all runtime hours since oil change date
             oil_hours = 0
-            for day_key, day_data in log.items():
+            for day_key, day_data in entries:
                 if day_key >= GENERATOR_OIL_CHANGE_DATE:
                     oil_hours += day_data.get("runtime_seconds", 0) / 3600
-            if running and generator_session_start:
-                oil_hours += (now - generator_session_start).total_seconds() / 3600
+            if running:
+                oil_hours += _generator_session_seconds() / 3600
             result["oil_change_hours_since"] = round(oil_hours, 1)
         except ValueError:
             result["oil_change_hours_since"] = None
@@ -940,7 +1211,12 @@ def start_telegram_bot():
     return bot
 
 
-if __name__ == "__main__":
+def on_server_start():
+    """Set up logging, log the startup configuration and start the Telegram bot.
+
+    Called once per server process: from __main__ for ``python app.py`` and
+    from the post_worker_init hook in gunicorn.conf.py.
+    """
     logging.basicConfig(
         level=logging.INFO,
         format="%(asctime)s %(levelname)s [%(name)s] %(message)s",
@@ -962,11 +1238,22 @@ if __name__ == "__main__":
         telegram_enabled = os.environ.get("TELEGRAM_ENABLED", "true").lower() != "false"
         telegram_token_set = bool(os.environ.get("TELEGRAM_BOT_TOKEN"))
         logger.info("TELEGRAM: enabled=%s token_set=%s", telegram_enabled, telegram_token_set)
-
-        # Flask debug reloader spawns two processes. Only start the bot once.
-        if os.environ.get("WERKZEUG_RUN_MAIN") == "true":
-            start_telegram_bot()
+        start_telegram_bot()
     else:
         logger.info("First-run mode — serving onboarding wizard")
 
-    app.run(host="0.0.0.0", port=int(os.environ.get("PORT", 8080)), debug=True)
+
+# Start pollers last, once every function and global they use is defined
+if _configured:
+    init_services()
+
+
+if __name__ == "__main__":
+    # Exit cleanly on SIGTERM (systemctl stop/restart) so atexit flushes run
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+
+    on_server_start()
+
+    # No debug reloader: it restarts on every data-file write and runs the
+    # pollers in two processes. Production runs under gunicorn.conf.py.
+    app.run(host="0.0.0.0", port=int(os.environ.get("PORT", 8080)))
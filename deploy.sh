@@ -70,6 +70,7 @@ REMOTE_USER="${DEPLOY_USER:-}"
 REMOTE_HOST="${DEPLOY_HOST:-}"
 REMOTE_DIR="${DEPLOY_DIR:-/home/${REMOTE_USER}/deye-dashboard}"
 SERVICE_NAME="${DEPLOY_SERVICE_NAME:-deye-dashboard}"
+APP_PORT="${PORT:-8080}"
 
 # Validation
 MISSING=()
@@ -101,6 +102,8 @@ echo -e "${GREEN}Deploying Deye Dashboard to ${REMOTE_HOST}...${NC}"
 # Files to deploy
 FILES=(
     "app.py"
+    "dump_json.py"
+    "gunicorn.conf.py"
     "inverter.py"
     "telegram_bot.py"
     "poems.py"
@@ -198,8 +201,9 @@ Type=simple
 User=${REMOTE_USER}
 WorkingDirectory=${REMOTE_DIR}
 Environment="PATH=${REMOTE_DIR}/venv/bin:/usr/local/sbin:/usr/local/bin:/usr/sbin:/usr/bin:/sbin:/bin"
+Environment=PORT=8080
 EnvironmentFile=-${REMOTE_DIR}/.env
-ExecStart=${REMOTE_DIR}/venv/bin/python app.py
+ExecStart=${REMOTE_DIR}/venv/bin/gunicorn --bind 0.0.0.0:\\\${PORT} --workers 1 --threads 4 --worker-class gthread app:app
 Restart=always
 RestartSec=10
 
@@ -215,7 +219,7 @@ sudo systemctl restart ${SERVICE_NAME}
 ENDSSH
 
 echo -e "${GREEN}Deployment complete!${NC}"
-echo -e "Dashboard should be available at: http://${REMOTE_HOST}:8080"
+echo -e "Dashboard should be available at: http://${REMOTE_HOST}:${APP_PORT}"
 echo ""
 echo "Useful commands:"
 echo "  Check status:  ssh ${REMOTE_USER}@${REMOTE_HOST} 'sudo systemctl status ${SERVICE_NAME}'"
@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+"""Pretty-print one of the dashboard's data files for debugging.
+
+The data files (phase_stats.json, phase_history.json, outage_history.json,
+...) are written as compact JSON. This prints them indented. JSONL journals
+(phase_history.jsonl) are printed one indented record per line.
+
+Usage:
+    python3 dump_json.py <FILE>
+
+Example:
+    python3 dump_json.py phase_history.json
+"""
+
+import json
+import sys
+
+
+def dump_pretty(path):
+    with open(path) as f:
+        if path.endswith(".jsonl"):
+            for line in f:
+                line = line.strip()
+                if line:
+                    print(json.dumps(json.loads(line), indent=2, ensure_ascii=False))
+        else:
+            print(json.dumps(json.load(f), indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        print("Usage: python3 dump_json.py <FILE>")
+        print("Example: python3 dump_json.py phase_history.json")
+        sys.exit(1)
+
+    dump_pretty(sys.argv[1])
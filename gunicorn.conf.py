@@ -0,0 +1,29 @@
+"""Gunicorn settings for the dashboard.
+
+Usage:
+    gunicorn app:app
+
+gunicorn picks this file up from the working directory by its default name.
+The systemd unit in deploy.sh repeats the bind/worker settings on the command
+line so the service still starts after a rollback to a tag without this file.
+
+A single worker keeps one set of pollers and in-memory caches; its threads
+serve requests concurrently while others wait on file or network I/O.
+"""
+
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8080')}"
+workers = 1
+threads = 4
+worker_class = "gthread"
+
+
+def post_worker_init(worker):
+    import app
+    app.on_server_start()
+
+
+def worker_exit(server, worker):
+    import app
+    app.flush_phase_data()
@@ -1,12 +1,18 @@
 """Deye inverter data reader module."""
+import bisect
 from dataclasses import dataclass
-from pysolarmanv5 import PySolarmanV5
+from pysolarmanv5 import PySolarmanV5, NoSocketAvailableError
+import socket
 import time
 import threading
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Errors that mean the logger connection is unusable and must be re-opened
+# (socket.timeout is an OSError subclass)
+CONNECTION_ERRORS = (OSError, NoSocketAvailableError)
+
 
 @dataclass
 class InverterConfig:
@@ -27,9 +33,7 @@ class InverterConfig:
 
 def to_signed(value):
     """Convert unsigned 16-bit to signed."""
-    if value >= 32768:
-        return value - 65536
-    return value
+    return (value ^ 0x8000) - 0x8000
 
 
 LIFEPO4_16S_CURVE = [
@@ -38,21 +42,23 @@ LIFEPO4_16S_CURVE = [
     (51.6, 40), (51.2, 30), (50.4, 17), (48.0, 0),
 ]
 
+# The curve in ascending voltage order, split for bisect lookups
+_CURVE_VOLTAGES = tuple(v for v, _ in reversed(LIFEPO4_16S_CURVE))
+_CURVE_SOCS = tuple(soc for _, soc in reversed(LIFEPO4_16S_CURVE))
+
 
 def voltage_to_soc(voltage):
     """Convert LiFePO4 16S battery voltage to SOC using discharge curve."""
-    if voltage >= LIFEPO4_16S_CURVE[0][0]:
+    if voltage >= _CURVE_VOLTAGES[-1]:
         return 100
-    if voltage <= LIFEPO4_16S_CURVE[-1][0]:
+    if voltage <= _CURVE_VOLTAGES[0]:
         return 0
-    # Find the two points to interpolate between
-    for i in range(len(LIFEPO4_16S_CURVE) - 1):
-        v_high, soc_high = LIFEPO4_16S_CURVE[i]
-        v_low, soc_low = LIFEPO4_16S_CURVE[i + 1]
-        if voltage >= v_low:
-            ratio = (voltage - v_low) / (v_high - v_low)
-            return int(soc_low + ratio * (soc_high - soc_low))
-    return 0
+    # Interpolate between the two points around voltage
+    i = bisect.bisect_right(_CURVE_VOLTAGES, voltage)
+    v_low, v_high = _CURVE_VOLTAGES[i - 1], _CURVE_VOLTAGES[i]
+    soc_low, soc_high = _CURVE_SOCS[i - 1], _CURVE_SOCS[i]
+    ratio = (voltage - v_low) / (v_high - v_low)
+    return int(soc_low + ratio * (soc_high - soc_low))
 
 
 class DeyeInverter:
@@ -77,8 +83,19 @@ class DeyeInverter:
             verbose=False,
             socket_timeout=10
         )
+        self._enable_keepalive()
         logger.info("Connected to inverter")
 
+    def _enable_keepalive(self):
+        """Turn on TCP keepalive so an idle persistent connection stays healthy."""
+        sock = getattr(self.inverter, "sock", None)
+        if sock is None:
+            return
+        try:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+        except OSError as e:
+            logger.debug("Could not enable TCP keepalive: %s", e)
+
     def disconnect(self):
         """Close connection."""
         if self.inverter:
@@ -90,251 +107,241 @@ class DeyeInverter:
         """Read a single holding register."""
         return self.inverter.read_holding_registers(address, 1)[0]
 
+    def read_registers(self, address: int, count: int) -> list:
+        """Read a contiguous range of holding registers in one request."""
+        return self.inverter.read_holding_registers(address, count)
+
     def read_all_data(self, battery_sampler=None) -> dict:
         """Read all inverter data and return as dictionary."""
         with self.lock:
             return self._read_all_data_unlocked(battery_sampler)
 
     def _read_all_data_unlocked(self, battery_sampler=None) -> dict:
-        """Internal: read all data (caller must hold self.lock)."""
-        if self.config.phases == 1:
-            return self._read_1p_data_unlocked(battery_sampler)
-        return self._read_3p_data_unlocked(battery_sampler)
+        """Internal: read all data (caller must hold self.lock).
 
-    def _read_1p_data_unlocked(self, battery_sampler=None) -> dict:
-        """Read all data from single-phase hybrid inverter (Sunsynk register map)."""
-        data = {}
+        The connection is kept open between polls. On a connection error it
+        is re-established and the read retried once; Modbus/V5 frame errors
+        leave the connection in place.
+        """
+        if self.config.phases == 1:
+            read_map = self._read_1p_registers
+        else:
+            read_map = self._read_3p_registers
 
-        try:
-            if not self.inverter:
-                self.connect()
+        for attempt in (1, 2):
+            data = {}
+            try:
+                if not self.inverter:
+                    self.connect()
+                read_map(data, battery_sampler)
+                return data
+            except CONNECTION_ERRORS as e:
+                logger.warning("Connection error reading inverter data (attempt %d/2): %s", attempt, e)
+                self.disconnect()
+                data["error"] = str(e)
+            except Exception as e:
+                logger.warning("Error reading inverter data: %s", e)
+                data["error"] = str(e)
+                return data
+        return data
 
-            # Solar PV
+    def _read_1p_registers(self, data, battery_sampler=None):
+        """Fill data from a single-phase hybrid inverter (Sunsynk register map)."""
+        # Solar PV
+        if self.config.pv_strings >= 2:
+            data["pv1_power"], data["pv2_power"] = self.read_registers(186, 2)
+        else:
             data["pv1_power"] = self.read_register(186)
-            time.sleep(0.05)
-            if self.config.pv_strings >= 2:
-                data["pv2_power"] = self.read_register(187)
-                time.sleep(0.05)
-            else:
-                data["pv2_power"] = 0
-            data["pv_total_power"] = data["pv1_power"] + data["pv2_power"]
-
-            # Battery
-            if self.config.has_battery:
-                data["battery_voltage"] = self.read_register(183) / 100
-                time.sleep(0.05)
-                raw_current = self.read_register(191)
-                data["battery_current"] = -to_signed(raw_current) / 100
-                time.sleep(0.05)
-
-                raw_soc = self.read_register(184)
-                time.sleep(0.05)
-                data["battery_soc_raw"] = raw_soc
-
-                if battery_sampler:
-                    smoothed_v = battery_sampler.get_voltage()
-                    if smoothed_v is not None:
-                        data["battery_voltage"] = smoothed_v
-                    smoothed_soc = battery_sampler.get_soc()
-                    if smoothed_soc is not None:
-                        data["battery_soc"] = smoothed_soc
-                    else:
-                        data["battery_soc"] = raw_soc
-                else:
-                    data["battery_soc"] = raw_soc
-                data["battery_power"] = int(data["battery_voltage"] * data["battery_current"])
-            else:
-                data["battery_voltage"] = 0
-                data["battery_current"] = 0
-                data["battery_soc"] = 0
-                data["battery_soc_raw"] = 0
-                data["battery_power"] = 0
-
-            # Grid
-            data["grid_voltage"] = self.read_register(150) / 10
-            time.sleep(0.05)
-            raw_grid_power = self.read_register(169)
-            data["grid_power"] = to_signed(raw_grid_power)
-            time.sleep(0.05)
+            data["pv2_power"] = 0
+        time.sleep(0.05)
+        data["pv_total_power"] = data["pv1_power"] + data["pv2_power"]
 
-            # Load
-            data["load_power"] = self.read_register(178)
-            time.sleep(0.05)
-            data["load_l1"] = self.read_register(176)
+        # Battery
+        if self.config.has_battery:
+            raw_v, raw_soc = self.read_registers(183, 2)
             time.sleep(0.05)
-
-            # Temperatures
-            data["dc_temp"] = (self.read_register(90) - 1000) / 10
-            time.sleep(0.05)
-            data["heatsink_temp"] = (self.read_register(91) - 1000) / 10
-            time.sleep(0.05)
-
-            # Daily stats
-            data["daily_pv"] = self.read_register(108) / 10
+            data["battery_voltage"] = raw_v / 100
+            raw_current = self.read_register(191)
+            data["battery_current"] = -to_signed(raw_current) / 100
             time.sleep(0.05)
-            data["daily_grid_import"] = self.read_register(76) / 10
-            time.sleep(0.05)
-            data["daily_grid_export"] = self.read_register(77) / 10
-            time.sleep(0.05)
-            data["daily_load"] = self.read_register(84) / 10
-            time.sleep(0.05)
-
-            # Generator (GEN/GRID2 port) — 1-phase Sunsynk uses register 166
-            if self.config.has_generator:
-                data["generator_power"] = self.read_register(166)
-                time.sleep(0.05)
-            else:
-                data["generator_power"] = 0
-
-            # Status indicators
-            if self.config.has_battery:
-                if data["battery_current"] > 0:
-                    data["battery_status"] = "Charging"
-                elif data["battery_current"] < 0:
-                    data["battery_status"] = "Discharging"
+            data["battery_soc_raw"] = raw_soc
+
+            if battery_sampler:
+                smoothed_v = battery_sampler.get_voltage()
+                if smoothed_v is not None:
+                    data["battery_voltage"] = smoothed_v
+                smoothed_soc = battery_sampler.get_soc()
+                if smoothed_soc is not None:
+                    data["battery_soc"] = smoothed_soc
                 else:
-                    data["battery_status"] = "Idle"
+                    data["battery_soc"] = raw_soc
             else:
-                data["battery_status"] = "N/A"
-
-            if data["grid_power"] > 0:
-                data["grid_status"] = "Importing"
-            elif data["grid_power"] < 0:
-                data["grid_status"] = "Exporting"
+                data["battery_soc"] = raw_soc
+            data["battery_power"] = int(data["battery_voltage"] * data["battery_current"])
+        else:
+            data["battery_voltage"] = 0
+            data["battery_current"] = 0
+            data["battery_soc"] = 0
+            data["battery_soc_raw"] = 0
+            data["battery_power"] = 0
+
+        # Grid
+        data["grid_voltage"] = self.read_register(150) / 10
+        time.sleep(0.05)
+        raw_grid_power = self.read_register(169)
+        data["grid_power"] = to_signed(raw_grid_power)
+        time.sleep(0.05)
+
+        # Load (176 = L1, 178 = total)
+        loads = self.read_registers(176, 3)
+        data["load_l1"] = loads[0]
+        data["load_power"] = loads[2]
+        time.sleep(0.05)
+
+        # Temperatures
+        dc_raw, heatsink_raw = self.read_registers(90, 2)
+        data["dc_temp"] = (dc_raw - 1000) / 10
+        data["heatsink_temp"] = (heatsink_raw - 1000) / 10
+        time.sleep(0.05)
+
+        # Daily stats
+        data["daily_pv"] = self.read_register(108) / 10
+        time.sleep(0.05)
+        daily_import, daily_export = self.read_registers(76, 2)
+        data["daily_grid_import"] = daily_import / 10
+        data["daily_grid_export"] = daily_export / 10
+        time.sleep(0.05)
+        data["daily_load"] = self.read_register(84) / 10
+        time.sleep(0.05)
+
+        # Generator (GEN/GRID2 port) — 1-phase Sunsynk uses register 166
+        if self.config.has_generator:
+            data["generator_power"] = self.read_register(166)
+            time.sleep(0.05)
+        else:
+            data["generator_power"] = 0
+
+        # Status indicators
+        if self.config.has_battery:
+            if data["battery_current"] > 0:
+                data["battery_status"] = "Charging"
+            elif data["battery_current"] < 0:
+                data["battery_status"] = "Discharging"
             else:
-                data["grid_status"] = "Idle"
-
-        except Exception as e:
-            data["error"] = str(e)
-        finally:
-            self.disconnect()
-
-        return data
+                data["battery_status"] = "Idle"
+        else:
+            data["battery_status"] = "N/A"
 
-    def _read_3p_data_unlocked(self, battery_sampler=None) -> dict:
-        """Read all data from 3-phase hybrid inverter (original register map)."""
-        data = {}
+        if data["grid_power"] > 0:
+            data["grid_status"] = "Importing"
+        elif data["grid_power"] < 0:
+            data["grid_status"] = "Exporting"
+        else:
+            data["grid_status"] = "Idle"
 
-        try:
-            if not self.inverter:
-                self.connect()
-            # Solar PV
+    def _read_3p_registers(self, data, battery_sampler=None):
+        """Fill data from a 3-phase hybrid inverter (original register map)."""
+        # Solar PV
+        if self.config.pv_strings >= 2:
+            data["pv1_power"], data["pv2_power"] = self.read_registers(514, 2)
+        else:
             data["pv1_power"] = self.read_register(514)
+            data["pv2_power"] = 0
+        time.sleep(0.05)
+        data["pv_total_power"] = data["pv1_power"] + data["pv2_power"]
+
+        # Battery (586 = current, 587 = voltage, 588 = SOC)
+        if self.config.has_battery:
+            raw_current, raw_v, raw_soc = self.read_registers(586, 3)
             time.sleep(0.05)
-            if self.config.pv_strings >= 2:
-                data["pv2_power"] = self.read_register(515)
-                time.sleep(0.05)
-            else:
-                data["pv2_power"] = 0
-            data["pv_total_power"] = data["pv1_power"] + data["pv2_power"]
-
-            # Battery
-            if self.config.has_battery:
-                data["battery_voltage"] = self.read_register(587) / 100
-                time.sleep(0.05)
-                raw_current = self.read_register(586)
-                data["battery_current"] = -to_signed(raw_current) / 100
-                time.sleep(0.05)
-
-                # SOC from register 588 (BMS-reported, same as Solarman)
-                # Use smoothed median from sampler if available for outlier rejection
-                raw_soc = self.read_register(588)
-                time.sleep(0.05)
-                data["battery_soc_raw"] = raw_soc
-
-                if battery_sampler:
-                    smoothed_v = battery_sampler.get_voltage()
-                    if smoothed_v is not None:
-                        data["battery_voltage"] = smoothed_v
-                    smoothed_soc = battery_sampler.get_soc()
-                    if smoothed_soc is not None:
-                        data["battery_soc"] = smoothed_soc
-                    else:
-                        data["battery_soc"] = raw_soc
+            data["battery_voltage"] = raw_v / 100
+            data["battery_current"] = -to_signed(raw_current) / 100
+
+            # SOC from register 588 (BMS-reported, same as Solarman)
+            # Use smoothed median from sampler if available for outlier rejection
+            data["battery_soc_raw"] = raw_soc
+
+            if battery_sampler:
+                smoothed_v = battery_sampler.get_voltage()
+                if smoothed_v is not None:
+                    data["battery_voltage"] = smoothed_v
+                smoothed_soc = battery_sampler.get_soc()
+                if smoothed_soc is not None:
+                    data["battery_soc"] = smoothed_soc
                 else:
                     data["battery_soc"] = raw_soc
-                data["battery_power"] = int(data["battery_voltage"] * data["battery_current"])
             else:
-                data["battery_voltage"] = 0
-                data["battery_current"] = 0
-                data["battery_soc"] = 0
-                data["battery_soc_raw"] = 0
-                data["battery_power"] = 0
-
-            # Grid
-            data["grid_voltage"] = self.read_register(598) / 10
-            time.sleep(0.05)
-            raw_grid_power = self.read_register(607)
-            data["grid_power"] = to_signed(raw_grid_power)
-            time.sleep(0.05)
-
-            # Load
-            data["load_power"] = self.read_register(653)
+                data["battery_soc"] = raw_soc
+            data["battery_power"] = int(data["battery_voltage"] * data["battery_current"])
+        else:
+            data["battery_voltage"] = 0
+            data["battery_current"] = 0
+            data["battery_soc"] = 0
+            data["battery_soc_raw"] = 0
+            data["battery_power"] = 0
+
+        # Grid
+        data["grid_voltage"] = self.read_register(598) / 10
+        time.sleep(0.05)
+        raw_grid_power = self.read_register(607)
+        data["grid_power"] = to_signed(raw_grid_power)
+        time.sleep(0.05)
+
+        # Temperatures
+        dc_raw, heatsink_raw = self.read_registers(540, 2)
+        data["dc_temp"] = (dc_raw - 1000) / 10
+        data["heatsink_temp"] = (heatsink_raw - 1000) / 10
+        time.sleep(0.05)
+
+        # Daily stats
+        data["daily_pv"] = self.read_register(502) / 10
+        time.sleep(0.05)
+        daily_import, daily_export = self.read_registers(520, 2)
+        data["daily_grid_import"] = daily_import / 10
+        data["daily_grid_export"] = daily_export / 10
+        time.sleep(0.05)
+        data["daily_load"] = self.read_register(526) / 10
+        time.sleep(0.05)
+
+        # Load and phase data (650-652 = L1-L3, 653 = total)
+        if self.config.phases == 3:
+            data["load_l1"], data["load_l2"], data["load_l3"], data["load_power"] = \
+                self.read_registers(650, 4)
             time.sleep(0.05)
 
-            # Temperatures
-            data["dc_temp"] = (self.read_register(540) - 1000) / 10
+            voltages = self.read_registers(644, 3)
+            data["voltage_l1"] = voltages[0] / 10
+            data["voltage_l2"] = voltages[1] / 10
+            data["voltage_l3"] = voltages[2] / 10
             time.sleep(0.05)
-            data["heatsink_temp"] = (self.read_register(541) - 1000) / 10
+        else:
+            data["load_power"] = self.read_register(653)
             time.sleep(0.05)
 
-            # Daily stats
-            data["daily_pv"] = self.read_register(502) / 10
-            time.sleep(0.05)
-            data["daily_grid_import"] = self.read_register(520) / 10
-            time.sleep(0.05)
-            data["daily_grid_export"] = self.read_register(521) / 10
-            time.sleep(0.05)
-            data["daily_load"] = self.read_register(526) / 10
+        # Generator (GEN/GRID2 port) — 3-phase uses register 667
+        if self.config.has_generator:
+            data["generator_power"] = self.read_register(667)
             time.sleep(0.05)
-
-            # Phase data (3-phase system)
-            if self.config.phases == 3:
-                data["load_l1"] = self.read_register(650)
-                time.sleep(0.05)
-                data["load_l2"] = self.read_register(651)
-                time.sleep(0.05)
-                data["load_l3"] = self.read_register(652)
-                time.sleep(0.05)
-
-                data["voltage_l1"] = self.read_register(644) / 10
-                time.sleep(0.05)
-                data["voltage_l2"] = self.read_register(645) / 10
-                time.sleep(0.05)
-                data["voltage_l3"] = self.read_register(646) / 10
-
-            # Generator (GEN/GRID2 port) — 3-phase uses register 667
-            if self.config.has_generator:
-                data["generator_power"] = self.read_register(667)
-                time.sleep(0.05)
-            else:
-                data["generator_power"] = 0
-
-            # Status indicators
-            if self.config.has_battery:
-                if data["battery_current"] > 0:
-                    data["battery_status"] = "Charging"
-                elif data["battery_current"] < 0:
-                    data["battery_status"] = "Discharging"
-                else:
-                    data["battery_status"] = "Idle"
-            else:
-                data["battery_status"] = "N/A"
-
-            if data["grid_power"] > 0:
-                data["grid_status"] = "Importing"
-            elif data["grid_power"] < 0:
-                data["grid_status"] = "Exporting"
+        else:
+            data["generator_power"] = 0
+
+        # Status indicators
+        if self.config.has_battery:
+            if data["battery_current"] > 0:
+                data["battery_status"] = "Charging"
+            elif data["battery_current"] < 0:
+                data["battery_status"] = "Discharging"
             else:
-                data["grid_status"] = "Idle"
-
-        except Exception as e:
-            logger.warning("Error reading inverter data: %s", e)
-            data["error"] = str(e)
-        finally:
-            self.disconnect()
+                data["battery_status"] = "Idle"
+        else:
+            data["battery_status"] = "N/A"
 
-        return data
+        if data["grid_power"] > 0:
+            data["grid_status"] = "Importing"
+        elif data["grid_power"] < 0:
+            data["grid_status"] = "Exporting"
+        else:
+            data["grid_status"] = "Idle"
 
     def detect_config(self):
         """Auto-detect inverter configuration by reading diagnostic registers.
@@ -505,9 +512,12 @@ class BatterySampler:
             with self.inverter.lock:
                 if not self.inverter.inverter:
                     self.inverter.connect()
-                raw_v = self.inverter.read_register(reg_voltage)
-                raw_soc = self.inverter.read_register(reg_soc)
-                self.inverter.disconnect()
+                try:
+                    raw_v = self.inverter.read_register(reg_voltage)
+                    raw_soc = self.inverter.read_register(reg_soc)
+                except CONNECTION_ERRORS:
+                    self.inverter.disconnect()
+                    raise
             voltage = raw_v / 100
         except Exception as e:
             logger.warning("BatterySampler: failed to read battery registers: %s", e)
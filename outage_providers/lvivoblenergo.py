@@ -13,6 +13,10 @@ logger = logging.getLogger(__name__)
 SCHEDULE_API_URL = "https://api.loe.lviv.ua/api/menus?page=1&type=photo-grafic"
 DEFAULT_GROUP = "4.1"
 
+# "Група 4.1. з 09:00 до 12:00, з 18:00 до 21:00" → group "4.1" + the rest
+_GROUP_RE = re.compile(r"Група\s+(\S+?)\.\s+(.+)", re.IGNORECASE)
+_TIME_RE = re.compile(r"з\s+(\d{1,2}):(\d{2})\s+до\s+(\d{1,2}):(\d{2})")
+
 
 class _TextExtractor(HTMLParser):
     def __init__(self):
@@ -37,17 +41,12 @@ def parse_group_windows(html, group):
     parser = _TextExtractor()
     parser.feed(html)
 
-    group_pattern = re.compile(
-        rf"Група\s+{re.escape(group)}\.\s+(.+)", re.IGNORECASE
-    )
-    time_pattern = re.compile(r"з\s+(\d{1,2}):(\d{2})\s+до\s+(\d{1,2}):(\d{2})")
-
     for line in parser.lines:
-        match = group_pattern.match(line)
-        if match:
-            rest = match.group(1)
+        match = _GROUP_RE.match(line)
+        if match and match.group(1) == group:
+            rest = match.group(2)
             windows = []
-            for m in time_pattern.finditer(rest):
+            for m in _TIME_RE.finditer(rest):
                 windows.append((
                     int(m.group(1)), int(m.group(2)),
                     int(m.group(3)), int(m.group(4)),
@@ -29,6 +29,7 @@ MANAGED_KEYS = [
     "TELEGRAM_ENABLED", "TELEGRAM_BOT_TOKEN", "TELEGRAM_ALLOWED_USERS",
     "TELEGRAM_PUBLIC",
 ]
+_MANAGED = frozenset(MANAGED_KEYS)
 
 
 def ask(prompt, default=""):
@@ -70,18 +71,19 @@ def load_existing_env(path=".env"):
     if not os.path.exists(path):
         return values, extra_lines
     with open(path, "r") as f:
-        for line in f:
-            stripped = line.strip()
-            if not stripped or stripped.startswith("#"):
-                continue
-            if "=" in stripped:
-                key, _, val = stripped.partition("=")
-                key = key.strip()
-                val = val.strip()
-                if key in MANAGED_KEYS:
-                    values[key] = val
-                else:
-                    extra_lines.append(stripped)
+        text = f.read()
+    for line in text.splitlines():
+        stripped = line.strip()
+        if stripped[:1] in ("", "#"):
+            continue
+        key, sep, val = stripped.partition("=")
+        if not sep:
+            continue
+        key = key.strip()
+        if key in _MANAGED:
+            values[key] = val.strip()
+        else:
+            extra_lines.append(stripped)
     return values, extra_lines
 
 
@@ -247,63 +249,81 @@ def section_telegram(defaults):
     return result
 
 
+def _is_true(value):
+    return value.lower() in ("true", "1", "yes")
+
+
+def _provider_is(name):
+    return lambda values: values.get("OUTAGE_PROVIDER", "lvivoblenergo") == name
+
+
+def _enabled(key):
+    return lambda values: _is_true(values.get(key, "false"))
+
+
+# .env layout: (header, section condition, rows). Each row is
+# (key, default, row condition); a None default writes the key only if set.
+_SECTIONS = (
+    ("# Deye Inverter Configuration", None, (
+        ("INVERTER_IP", "", None),
+        ("LOGGER_SERIAL", "", None),
+    )),
+    ("# Weather (coordinates for Open-Meteo API)", None, (
+        ("WEATHER_LATITUDE", "50.4501", None),
+        ("WEATHER_LONGITUDE", "30.5234", None),
+    )),
+    ("# Outage Schedule Provider", None, (
+        ("OUTAGE_PROVIDER", "lvivoblenergo", None),
+        ("OUTAGE_GROUP", None, _provider_is("lvivoblenergo")),
+        ("OUTAGE_REGION_ID", None, _provider_is("yasno")),
+        ("OUTAGE_DSO_ID", None, _provider_is("yasno")),
+        ("OUTAGE_GROUP", None, _provider_is("yasno")),
+    )),
+    ("# Generator", _enabled("INVERTER_HAS_GENERATOR"), (
+        ("INVERTER_HAS_GENERATOR", "true", None),
+        ("GENERATOR_FUEL_RATE", None, None),
+        ("GENERATOR_OIL_CHANGE_DATE", None, None),
+    )),
+    ("# Telegram Bot", None, (
+        ("TELEGRAM_ENABLED", "false", None),
+        ("TELEGRAM_BOT_TOKEN", "", _enabled("TELEGRAM_ENABLED")),
+        ("TELEGRAM_ALLOWED_USERS", "", _enabled("TELEGRAM_ENABLED")),
+        ("TELEGRAM_PUBLIC", "false", _enabled("TELEGRAM_ENABLED")),
+    )),
+)
+
+
 def write_env(values, extra_lines, path=".env"):
     """Write .env file from collected values and preserved extra lines."""
-    lines = []
-
-    lines.append("# Deye Inverter Configuration")
-    lines.append(f"INVERTER_IP={values.get('INVERTER_IP', '')}")
-    lines.append(f"LOGGER_SERIAL={values.get('LOGGER_SERIAL', '')}")
-    lines.append("")
-
-    lines.append("# Weather (coordinates for Open-Meteo API)")
-    lines.append(f"WEATHER_LATITUDE={values.get('WEATHER_LATITUDE', '50.4501')}")
-    lines.append(f"WEATHER_LONGITUDE={values.get('WEATHER_LONGITUDE', '30.5234')}")
-    lines.append("")
-
-    lines.append("# Outage Schedule Provider")
-    provider = values.get("OUTAGE_PROVIDER", "lvivoblenergo")
-    lines.append(f"OUTAGE_PROVIDER={provider}")
-    if provider == "lvivoblenergo" and "OUTAGE_GROUP" in values:
-        lines.append(f"OUTAGE_GROUP={values['OUTAGE_GROUP']}")
-    elif provider == "yasno":
-        if "OUTAGE_REGION_ID" in values:
-            lines.append(f"OUTAGE_REGION_ID={values['OUTAGE_REGION_ID']}")
-        if "OUTAGE_DSO_ID" in values:
-            lines.append(f"OUTAGE_DSO_ID={values['OUTAGE_DSO_ID']}")
-        if "OUTAGE_GROUP" in values:
-            lines.append(f"OUTAGE_GROUP={values['OUTAGE_GROUP']}")
-    lines.append("")
-
-    # Generator
-    gen_enabled = values.get("INVERTER_HAS_GENERATOR", "false")
-    if gen_enabled.lower() in ("true", "1", "yes"):
-        lines.append("# Generator")
-        lines.append(f"INVERTER_HAS_GENERATOR=true")
-        if "GENERATOR_FUEL_RATE" in values:
-            lines.append(f"GENERATOR_FUEL_RATE={values['GENERATOR_FUEL_RATE']}")
-        if "GENERATOR_OIL_CHANGE_DATE" in values:
-            lines.append(f"GENERATOR_OIL_CHANGE_DATE={values['GENERATOR_OIL_CHANGE_DATE']}")
-        lines.append("")
-
-    lines.append("# Telegram Bot")
-    telegram_enabled = values.get("TELEGRAM_ENABLED", "false")
-    lines.append(f"TELEGRAM_ENABLED={telegram_enabled}")
-    if telegram_enabled.lower() in ("true", "1", "yes"):
-        lines.append(f"TELEGRAM_BOT_TOKEN={values.get('TELEGRAM_BOT_TOKEN', '')}")
-        lines.append(f"TELEGRAM_ALLOWED_USERS={values.get('TELEGRAM_ALLOWED_USERS', '')}")
-        lines.append(f"TELEGRAM_PUBLIC={values.get('TELEGRAM_PUBLIC', 'false')}")
+    if _is_true(values.get("INVERTER_HAS_GENERATOR", "false")):
+        values = {**values, "INVERTER_HAS_GENERATOR": "true"}
+
+    blocks = []
+    for header, when, rows in _SECTIONS:
+        if when and not when(values):
+            continue
+        block = [header]
+        append = block.append
+        for key, default, row_when in rows:
+            if row_when and not row_when(values):
+                continue
+            if default is None and key not in values:
+                continue
+            append(f"{key}={values.get(key, default)}")
+        blocks.append("\n".join(block))
 
     # Preserve unrecognized lines (e.g. DEPLOY_* from deploy.sh)
     if extra_lines:
-        lines.append("")
-        lines.append("# Additional settings")
-        lines.extend(extra_lines)
+        blocks.append("\n".join(["# Additional settings", *extra_lines]))
 
-    lines.append("")  # trailing newline
+    data = ("\n\n".join(blocks) + "\n").encode()
 
-    with open(path, "w") as f:
-        f.write("\n".join(lines))
+    # The file holds the Telegram bot token, so keep it owner-only; os.open's
+    # mode only applies on creation, so tighten an existing file before writing
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "wb") as f:
+        os.fchmod(fd, 0o600)
+        f.write(data)
 
 
 def main():
@@ -1,9 +1,22 @@
 """Shared fixtures for Deye Dashboard tests."""
+import os
+
+# Must be set before any test module imports app, so a developer .env can
+# never start real pollers alongside the tests
+os.environ.setdefault("DEYE_DISABLE_POLLER_THREADS", "1")
+
 import pytest
 from unittest.mock import patch, MagicMock
 from inverter import DeyeInverter
 
 
+@pytest.fixture(scope="session", autouse=True)
+def _preload_app():
+    """Import app once, with its background threads disabled, before any test."""
+    import app
+    yield app
+
+
 @pytest.fixture
 def mock_inverter():
     """Create a DeyeInverter with a mocked PySolarmanV5 connection."""
@@ -22,3 +35,15 @@ def mock_read_register(register_values):
     def read_register(addr):
         return register_values.get(addr, 0)
     return read_register
+
+
+def mock_read_holding_registers(register_values):
+    """Return a side_effect for PySolarmanV5.read_holding_registers(addr, count).
+
+    Usage:
+        inverter.inverter.read_holding_registers.side_effect = \
+            mock_read_holding_registers({586: 65436, 587: 5200})
+    """
+    def read_holding_registers(addr, count):
+        return [register_values.get(addr + i, 0) for i in range(count)]
+    return read_holding_registers
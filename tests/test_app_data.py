@@ -1,6 +1,7 @@
 """Tests for data recording functions in app.py."""
 import json
 import os
+import time
 import pytest
 from unittest.mock import patch
 from datetime import datetime, timedelta
@@ -74,7 +75,7 @@ class TestTrackGeneratorRuntime:
             # First: start running
             app.track_generator_runtime(1000)
             # Simulate 60s elapsed
-            app.generator_session_start = datetime.now() - timedelta(seconds=60)
+            app.generator_session_start = time.monotonic() - 60
             # Then: stop running
             app.track_generator_runtime(0)
         with open(log_file) as f:
@@ -125,12 +126,34 @@ class TestTrackGeneratorRuntime:
         assert len(log) <= 90
 
 
+def _reset_phase_cache():
+    """Drop the in-memory phase stats/history so the next access reloads."""
+    import app
+    if app._phase_flush_timer is not None:
+        app._phase_flush_timer.cancel()
+        app._phase_flush_timer = None
+    app._phase_stats_cache = None
+    app._phase_history_cache = None
+    app._phase_stats_dirty = False
+    app._phase_stats_path = None
+
+
+@pytest.fixture(autouse=True)
+def _no_phase_flush_timer(monkeypatch):
+    """Keep the flush timer and atexit hook from writing stats after a test."""
+    import app
+    monkeypatch.setattr(app, "_schedule_phase_flush", lambda: None)
+    yield
+    _reset_phase_cache()
+
+
 class TestRecordPhaseSample:
     def _reset_globals(self):
         import app
         app.last_sample_time = None
         app.last_history_save = None
         app.phase_accumulator = {"l1": 0, "l2": 0, "l3": 0}
+        _reset_phase_cache()
 
     def test_first_sample_no_energy(self, tmp_path):
         self._reset_globals()
@@ -140,6 +163,7 @@ class TestRecordPhaseSample:
              patch("app.PHASE_HISTORY_FILE", history_file):
             import app
             app.record_phase_sample(100, 200, 300)
+            app.flush_phase_data()
         with open(stats_file) as f:
             stats = json.load(f)
         today = datetime.now().strftime("%Y-%m-%d")
@@ -157,9 +181,10 @@ class TestRecordPhaseSample:
             # First sample: sets last_sample_time
             app.record_phase_sample(1000, 2000, 3000)
             # Simulate 60 seconds elapsed
-            app.last_sample_time = datetime.now() - timedelta(seconds=60)
+            app.last_sample_time = time.monotonic() - 60
             # Second sample
             app.record_phase_sample(1000, 2000, 3000)
+            app.flush_phase_data()
         with open(stats_file) as f:
             stats = json.load(f)
         today = datetime.now().strftime("%Y-%m-%d")
@@ -176,8 +201,9 @@ class TestRecordPhaseSample:
             import app
             app.record_phase_sample(1000, 2000, 3000)
             # Simulate 10 minutes elapsed (> 5 min threshold)
-            app.last_sample_time = datetime.now() - timedelta(minutes=10)
+            app.last_sample_time = time.monotonic() - 600
             app.record_phase_sample(1000, 2000, 3000)
+            app.flush_phase_data()
         with open(stats_file) as f:
             stats = json.load(f)
         today = datetime.now().strftime("%Y-%m-%d")
@@ -192,8 +218,9 @@ class TestRecordPhaseSample:
              patch("app.PHASE_HISTORY_FILE", history_file):
             import app
             app.record_phase_sample(100, 200, 300)
-            app.last_sample_time = datetime.now() - timedelta(seconds=30)
+            app.last_sample_time = time.monotonic() - 30
             app.record_phase_sample(500, 600, 700)
+            app.flush_phase_data()
         with open(stats_file) as f:
             stats = json.load(f)
         today = datetime.now().strftime("%Y-%m-%d")
@@ -201,8 +228,53 @@ class TestRecordPhaseSample:
         assert stats[today]["l2_max"] == 600
         assert stats[today]["l3_max"] == 700
 
+    def test_summary_precomputed(self, tmp_path):
+        self._reset_globals()
+        stats_file = str(tmp_path / "phase_stats.json")
+        history_file = str(tmp_path / "phase_history.json")
+        with patch("app.PHASE_STATS_FILE", stats_file), \
+             patch("app.PHASE_HISTORY_FILE", history_file):
+            import app
+            app.record_phase_sample(1000, 2000, 3000)
+            app.last_sample_time = time.monotonic() - 60
+            app.record_phase_sample(1000, 2000, 3000)
+            stats = app.load_phase_stats()
+        today = datetime.now().strftime("%Y-%m-%d")
+        summary = stats[today]["summary"]
+        assert summary["date"] == today
+        assert summary["l3_max"] == 3000
+        assert summary["l1_pct"] == pytest.approx(16.7, abs=0.1)
+
+    def test_30_day_rotation_on_new_day(self, tmp_path):
+        self._reset_globals()
+        stats_file = str(tmp_path / "phase_stats.json")
+        history_file = str(tmp_path / "phase_history.json")
+        base = datetime.now()
+        entry = {"l1_wh": 0, "l2_wh": 0, "l3_wh": 0, "samples": 1,
+                 "l1_max": 0, "l2_max": 0, "l3_max": 0}
+        old_stats = {
+            (base - timedelta(days=i)).strftime("%Y-%m-%d"): dict(entry)
+            for i in range(1, 35)
+        }
+        with open(stats_file, "w") as f:
+            json.dump(old_stats, f)
+        with patch("app.PHASE_STATS_FILE", stats_file), \
+             patch("app.PHASE_HISTORY_FILE", history_file):
+            import app
+            app.record_phase_sample(100, 200, 300)
+            app.flush_phase_data()
+        with open(stats_file) as f:
+            stats = json.load(f)
+        assert len(stats) == 30
+        assert base.strftime("%Y-%m-%d") in stats
+        assert (base - timedelta(days=29)).strftime("%Y-%m-%d") in stats
+
 
 class TestSaveToPhaseHistory:
+    @pytest.fixture(autouse=True)
+    def _reset(self):
+        _reset_phase_cache()
+
     def test_appends_data_point(self, tmp_path):
         history_file = str(tmp_path / "phase_history.json")
         with patch("app.PHASE_HISTORY_FILE", history_file):
@@ -230,3 +302,165 @@ class TestSaveToPhaseHistory:
         with open(history_file) as f:
             history = json.load(f)
         assert len(history) <= 7
+
+    def test_date_index_stays_sorted(self, tmp_path):
+        history_file = str(tmp_path / "phase_history.json")
+        base = datetime.now()
+        with open(history_file, "w") as f:
+            json.dump({(base - timedelta(days=i)).strftime("%Y-%m-%d"): []
+                       for i in (3, 1, 5)}, f)
+        with patch("app.PHASE_HISTORY_FILE", history_file):
+            import app
+            app.save_to_phase_history(base, 100, 200, 300)
+            assert app._phase_history_dates == sorted(app.load_phase_history())
+            assert app._phase_history_dates[-1] == base.strftime("%Y-%m-%d")
+
+    def test_same_day_points_journaled_and_replayed(self, tmp_path):
+        history_file = str(tmp_path / "phase_history.json")
+        with patch("app.PHASE_HISTORY_FILE", history_file):
+            import app
+            now = datetime.now().replace(hour=12, minute=0, second=0)
+            app.save_to_phase_history(now, 100, 200, 300)
+            app.save_to_phase_history(now + timedelta(seconds=30), 400, 500, 600)
+            # Second point goes to the journal, not the snapshot
+            with open(history_file) as f:
+                assert len(json.load(f)[now.strftime("%Y-%m-%d")]) == 1
+            # A fresh load replays the journal
+            _reset_phase_cache()
+            points = app.load_phase_history()[now.strftime("%Y-%m-%d")]
+        assert [p["l1"] for p in points] == [100, 400]
+
+
+    def test_clear_during_sample_keeps_cache_index_and_disk_in_step(self, tmp_path):
+        import threading
+        history_file = str(tmp_path / "phase_history.json")
+        with patch("app.PHASE_HISTORY_FILE", history_file):
+            import app
+            real_load = app.load_phase_history
+            clearer = threading.Thread(target=app.save_phase_history, args=({},))
+
+            def load_then_clear():
+                # Fire /api/phase-stats/clear's history reset mid-sample
+                history = real_load()
+                if not clearer.is_alive() and clearer.ident is None:
+                    clearer.start()
+                    clearer.join(0.2)
+                return history
+
+            now = datetime.now().replace(hour=12, minute=0, second=0)
+            with patch("app.load_phase_history", side_effect=load_then_clear):
+                app.save_to_phase_history(now, 100, 200, 300)
+            clearer.join()
+            app.save_to_phase_history(now + timedelta(seconds=30), 400, 500, 600)
+
+            history = app.load_phase_history()
+            assert app._phase_history_dates == sorted(history)
+            assert app._phase_history_dates == [now.strftime("%Y-%m-%d")]
+            on_disk = {day: list(points) for day, points in app._read_phase_history().items()}
+            assert on_disk == {day: list(points) for day, points in history.items()}
+
+
+class TestPhaseSampleQueue:
+    def test_enqueue_captures_timestamps(self):
+        import queue
+        import app
+        q = queue.Queue(maxsize=4)
+        with patch("app._phase_sample_queue", q):
+            app.enqueue_phase_sample(100, 200, 300)
+        now, now_m, l1, l2, l3 = q.get_nowait()
+        assert isinstance(now, datetime)
+        assert now_m <= time.monotonic()
+        assert (l1, l2, l3) == (100, 200, 300)
+
+    def test_full_queue_drops_sample(self):
+        import queue
+        import app
+        q = queue.Queue(maxsize=1)
+        with patch("app._phase_sample_queue", q):
+            app.enqueue_phase_sample(100, 200, 300)
+            app.enqueue_phase_sample(400, 500, 600)  # must not block or raise
+        assert q.qsize() == 1
+        assert q.get_nowait()[2] == 100
+
+
+class TestCachedJson:
+    def test_reuses_parsed_object_until_file_changes(self, tmp_path):
+        import app
+        path = str(tmp_path / "outages.json")
+        with open(path, "w") as f:
+            json.dump([{"id": 1}], f)
+        first = app.cached_json(path, [])
+        assert app.cached_json(path, []) is first
+        # External write (different size) invalidates the entry
+        with open(path, "w") as f:
+            json.dump([{"id": 1}, {"id": 2}], f)
+        assert len(app.cached_json(path, [])) == 2
+
+    def test_save_writes_through(self, tmp_path):
+        import app
+        path = str(tmp_path / "outages.json")
+        with open(path, "w") as f:
+            json.dump([], f)
+        app.cached_json(path, [])
+        new = [{"id": 3}]
+        app._save_json_file(path, new)
+        assert app.cached_json(path, []) is new
+
+    def test_missing_file_returns_default(self, tmp_path):
+        import app
+        assert app.cached_json(str(tmp_path / "missing.json"), []) == []
+
+
+class TestAtomicWrite:
+    def test_replaces_file_and_removes_temp(self, tmp_path):
+        import app
+        path = str(tmp_path / "data.json")
+        with open(path, "w") as f:
+            f.write('{"old": true}')
+        app.atomic_write(path, b'{"new":true}')
+        with open(path) as f:
+            assert json.load(f) == {"new": True}
+        assert not os.path.exists(path + ".tmp")
+
+    def test_failed_write_keeps_old_file(self, tmp_path):
+        import app
+        path = str(tmp_path / "data.json")
+        with open(path, "w") as f:
+            f.write('{"old": true}')
+        with patch("app.os.fsync", side_effect=OSError("disk full")):
+            with pytest.raises(OSError):
+                app.atomic_write(path, b'{"new":true}')
+        with open(path) as f:
+            assert json.load(f) == {"old": True}
+
+
+class TestOutageHistory:
+    @pytest.fixture(autouse=True)
+    def _reset(self):
+        import app
+        app._outage_history_cache = None
+        yield
+        app._outage_history_cache = None
+
+    def test_capped_at_max_events(self, tmp_path):
+        history_file = str(tmp_path / "outage_history.json")
+        with patch("app.OUTAGE_HISTORY_FILE", history_file):
+            import app
+            history = app.load_outage_history()
+            for i in range(app.OUTAGE_HISTORY_MAX_EVENTS + 5):
+                history.append({"id": i, "type": "start"})
+            app.save_outage_history(history)
+        with open(history_file) as f:
+            saved = json.load(f)
+        assert len(saved) == app.OUTAGE_HISTORY_MAX_EVENTS
+        assert saved[0]["id"] == 5
+        assert not os.path.exists(history_file + ".tmp")
+
+    def test_loaded_once(self, tmp_path):
+        history_file = str(tmp_path / "outage_history.json")
+        with open(history_file, "w") as f:
+            json.dump([{"id": 1, "type": "start"}], f)
+        with patch("app.OUTAGE_HISTORY_FILE", history_file):
+            import app
+            assert app.load_outage_history() is app.load_outage_history()
+            assert list(app.load_outage_history()) == [{"id": 1, "type": "start"}]
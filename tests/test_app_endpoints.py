@@ -1,61 +1,110 @@
 """Tests for Flask API endpoints in app.py."""
 import json
 import pytest
-from unittest.mock import patch, MagicMock, PropertyMock
+from types import SimpleNamespace
+from unittest.mock import patch, MagicMock
 from datetime import datetime, timedelta
 
 from inverter import InverterConfig
 
+try:
+    import orjson
+    _loads = orjson.loads
+except ImportError:
+    _loads = json.loads
 
-@pytest.fixture
-def client():
-    """Create a Flask test client with mocked pollers."""
+
+def _json(resp):
+    """Parse a response body (orjson when available, like the app itself)."""
+    return _loads(resp.data)
+
+# Shared configs; the endpoints only read them
+_DEFAULT_3PHASE_CFG = InverterConfig(phases=3, has_battery=True, pv_strings=2, has_generator=False)
+_CFG_NO_GEN = InverterConfig(has_generator=False)
+_CFG_GEN = InverterConfig(has_generator=True)
+
+# Expected phase shares for the 1000/2000/3000 Wh fixture, to one decimal
+_APPROX_16_7 = pytest.approx(16.7, abs=0.1)
+_APPROX_33_3 = pytest.approx(33.3, abs=0.1)
+_APPROX_50_0 = pytest.approx(50.0, abs=0.1)
+
+_PATCHED_GLOBALS = ("inverter_poller", "outage_poller", "weather_poller",
+                    "inverter_config", "_configured")
+
+
+@pytest.fixture(scope="session")
+def _app_module():
+    """Import app once and build a single Flask test client for the suite."""
     import app as app_module
 
     app_module.app.config["TESTING"] = True
 
-    # Store originals
-    orig_inverter_poller = app_module.inverter_poller
-    orig_outage_poller = app_module.outage_poller
-    orig_weather_poller = app_module.weather_poller
-    orig_inverter_config = app_module.inverter_config
+    # Store originals, restored when the session ends
+    originals = {name: getattr(app_module, name) for name in _PATCHED_GLOBALS}
 
-    # Create mock pollers
-    mock_inv_poller = MagicMock()
-    mock_weather_poller = MagicMock()
+    # Endpoints behave as on a configured install; pollers are mocked per test
+    app_module._configured = True
+
+    yield app_module, app_module.app.test_client()
 
+    for name, value in originals.items():
+        setattr(app_module, name, value)
+
+
+@pytest.fixture
+def client(_app_module):
+    """Flask test client with fresh mocked pollers."""
+    app_module, c = _app_module
+
+    mock_inv_poller = MagicMock()
     app_module.inverter_poller = mock_inv_poller
-    app_module.weather_poller = mock_weather_poller
-    app_module.inverter_config = InverterConfig(phases=3, has_battery=True, pv_strings=2, has_generator=False)
+    app_module.weather_poller = MagicMock()
+    app_module.outage_poller = None
+    app_module.inverter_config = _DEFAULT_3PHASE_CFG
 
-    with app_module.app.test_client() as c:
-        yield c, mock_inv_poller, app_module
+    yield c, mock_inv_poller, app_module
 
-    # Restore originals
-    app_module.inverter_poller = orig_inverter_poller
-    app_module.outage_poller = orig_outage_poller
-    app_module.weather_poller = orig_weather_poller
-    app_module.inverter_config = orig_inverter_config
+
+@pytest.fixture(autouse=True)
+def stubs(monkeypatch):
+    """Stub out the app's file-backed storage; save_* are MagicMocks for assertions.
+
+    Tests that need stored data set e.g. stubs.phase_stats before the request.
+    """
+    ns = SimpleNamespace(
+        phase_stats={},
+        outage_history=[],
+        generator_log={},
+        save_phase_stats=MagicMock(),
+        save_phase_history=MagicMock(),
+        save_outage_history=MagicMock(),
+    )
+    monkeypatch.setattr("app.load_phase_stats", lambda: ns.phase_stats)
+    monkeypatch.setattr("app.load_outage_history", lambda: ns.outage_history)
+    monkeypatch.setattr("app.load_generator_log", lambda: ns.generator_log)
+    monkeypatch.setattr("app.save_phase_stats", ns.save_phase_stats)
+    monkeypatch.setattr("app.save_phase_history", ns.save_phase_history)
+    monkeypatch.setattr("app.save_outage_history", ns.save_outage_history)
+    return ns
 
 
 class TestGetData:
     def test_503_when_no_data(self, client):
         c, mock_inv, _ = client
-        type(mock_inv).data = PropertyMock(return_value=None)
+        mock_inv.data = None
         resp = c.get("/api/data")
         assert resp.status_code == 503
 
     def test_returns_data_with_config(self, client):
         c, mock_inv, app_module = client
-        type(mock_inv).data = PropertyMock(return_value={
+        mock_inv.data = {
             "pv_total_power": 500,
             "battery_soc": 75,
             "grid_power": -100,
-        })
+        }
         app_module.outage_poller = None
         resp = c.get("/api/data")
-        assert resp.status_code == 200
-        data = resp.get_json()
+        data = _json(resp)
         assert data["pv_total_power"] == 500
         assert "config" in data
         assert data["config"]["phases"] == 3
@@ -63,41 +112,36 @@ class TestGetData:
 
 class TestGetPhaseStats:
     def test_empty_stats_returns_empty_list(self, client):
-        c, _, app_module = client
-        with patch.object(app_module, "load_phase_stats", return_value={}):
-            resp = c.get("/api/phase-stats")
-        assert resp.status_code == 200
-        assert resp.get_json() == []
+        c, _, _ = client
+        resp = c.get("/api/phase-stats")
+        assert _json(resp) == []
 
-    def test_calculates_percentages(self, client):
-        c, _, app_module = client
-        stats = {
+    def test_calculates_percentages(self, client, stubs):
+        c, _, _ = client
+        stubs.phase_stats = {
             "2025-01-15": {
                 "l1_wh": 1000, "l2_wh": 2000, "l3_wh": 3000,
                 "samples": 100, "l1_max": 500, "l2_max": 1000, "l3_max": 1500,
             }
         }
-        with patch.object(app_module, "load_phase_stats", return_value=stats):
-            resp = c.get("/api/phase-stats")
-        data = resp.get_json()
+        resp = c.get("/api/phase-stats")
+        data = _json(resp)
         assert len(data) == 1
         entry = data[0]
-        assert entry["l1_pct"] == pytest.approx(16.7, abs=0.1)
-        assert entry["l2_pct"] == pytest.approx(33.3, abs=0.1)
-        assert entry["l3_pct"] == pytest.approx(50.0, abs=0.1)
+        assert entry["l1_pct"] == _APPROX_16_7
+        assert entry["l2_pct"] == _APPROX_33_3
+        assert entry["l3_pct"] == _APPROX_50_0
 
-    def test_zero_total_no_division_error(self, client):
-        c, _, app_module = client
-        stats = {
+    def test_zero_total_no_division_error(self, client, stubs):
+        c, _, _ = client
+        stubs.phase_stats = {
             "2025-01-15": {
                 "l1_wh": 0, "l2_wh": 0, "l3_wh": 0,
                 "samples": 1, "l1_max": 0, "l2_max": 0, "l3_max": 0,
             }
         }
-        with patch.object(app_module, "load_phase_stats", return_value=stats):
-            resp = c.get("/api/phase-stats")
-        assert resp.status_code == 200
-        entry = resp.get_json()[0]
+        resp = c.get("/api/phase-stats")
+        entry = _json(resp)[0]
         assert entry["l1_pct"] == 0
         assert entry["l2_pct"] == 0
         assert entry["l3_pct"] == 0
@@ -108,8 +152,7 @@ class TestGetOutageSchedule:
         c, _, app_module = client
         app_module.outage_poller = None
         resp = c.get("/api/outage_schedule")
-        assert resp.status_code == 200
-        assert resp.get_json()["status"] == "disabled"
+        assert _json(resp)["status"] == "disabled"
 
     def test_active_outage_returns_times(self, client):
         c, _, app_module = client
@@ -123,7 +166,7 @@ class TestGetOutageSchedule:
         }
         app_module.outage_poller = mock_poller
         resp = c.get("/api/outage_schedule")
-        data = resp.get_json()
+        data = _json(resp)
         assert data["status"] == "active"
         assert "start_time" in data
         assert "end_time" in data
@@ -131,37 +174,33 @@ class TestGetOutageSchedule:
 
 
 class TestAddOutage:
-    def test_start_event_appended(self, client):
-        c, _, app_module = client
-        with patch.object(app_module, "load_outage_history", return_value=[]), \
-             patch.object(app_module, "save_outage_history") as mock_save:
-            resp = c.post("/api/outages", json={
-                "type": "start",
-                "timestamp": "2025-01-15T10:00:00",
-                "voltage": 0,
-            })
+    def test_start_event_appended(self, client, stubs):
+        c, _, _ = client
+        resp = c.post("/api/outages", json={
+            "type": "start",
+            "timestamp": "2025-01-15T10:00:00",
+            "voltage": 0,
+        })
         assert resp.status_code == 200
-        saved = mock_save.call_args[0][0]
+        saved = stubs.save_outage_history.call_args[0][0]
         assert len(saved) == 1
         assert saved[0]["type"] == "start"
 
-    def test_end_event_calculates_duration(self, client):
-        c, _, app_module = client
-        existing = [{
+    def test_end_event_calculates_duration(self, client, stubs):
+        c, _, _ = client
+        stubs.outage_history = [{
             "id": 1,
             "type": "start",
             "timestamp": "2025-01-15T10:00:00",
             "voltage": 0,
         }]
-        with patch.object(app_module, "load_outage_history", return_value=existing), \
-             patch.object(app_module, "save_outage_history") as mock_save:
-            resp = c.post("/api/outages", json={
-                "type": "end",
-                "timestamp": "2025-01-15T11:00:00",
-                "voltage": 230,
-            })
+        resp = c.post("/api/outages", json={
+            "type": "end",
+            "timestamp": "2025-01-15T11:00:00",
+            "voltage": 230,
+        })
         assert resp.status_code == 200
-        saved = mock_save.call_args[0][0]
+        saved = stubs.save_outage_history.call_args[0][0]
         # The start event should have been updated with duration
         assert saved[0]["duration"] == 3600  # 1 hour in seconds
 
@@ -169,21 +208,20 @@ class TestAddOutage:
 class TestGetGenerator:
     def test_disabled_returns_false(self, client):
         c, _, app_module = client
-        app_module.inverter_config = InverterConfig(has_generator=False)
+        app_module.inverter_config = _CFG_NO_GEN
         resp = c.get("/api/generator")
-        data = resp.get_json()
+        data = _json(resp)
         assert data["enabled"] is False
 
     def test_running_with_fuel_data(self, client):
         c, mock_inv, app_module = client
-        app_module.inverter_config = InverterConfig(has_generator=True)
-        type(mock_inv).data = PropertyMock(return_value={"generator_power": 3000})
-        with patch.object(app_module, "load_generator_log", return_value={}), \
-             patch("app.GENERATOR_FUEL_RATE", 2.5), \
+        app_module.inverter_config = _CFG_GEN
+        mock_inv.data = {"generator_power": 3000}
+        with patch("app.GENERATOR_FUEL_RATE", 2.5), \
              patch("app.GENERATOR_OIL_CHANGE_DATE", ""), \
              patch("app.generator_session_start", None):
             resp = c.get("/api/generator")
-        data = resp.get_json()
+        data = _json(resp)
         assert data["enabled"] is True
         assert data["running"] is True
         assert data["power"] == 3000
@@ -192,32 +230,28 @@ class TestGetGenerator:
 class TestGetWeather:
     def test_503_when_no_data(self, client):
         c, _, app_module = client
-        type(app_module.weather_poller).data = PropertyMock(return_value=None)
+        app_module.weather_poller.data = None
         resp = c.get("/api/weather")
         assert resp.status_code == 503
 
     def test_returns_data(self, client):
         c, _, app_module = client
-        type(app_module.weather_poller).data = PropertyMock(return_value={
+        app_module.weather_poller.data = {
             "temperature": 22.5,
             "weather_code": 0,
-        })
+        }
         resp = c.get("/api/weather")
-        assert resp.status_code == 200
-        data = resp.get_json()
+        data = _json(resp)
         assert data["temperature"] == 22.5
 
 
 class TestClearEndpoints:
-    def test_clear_outages_and_phase_stats(self, client):
-        c, _, app_module = client
-        with patch.object(app_module, "save_outage_history") as mock_outage, \
-             patch.object(app_module, "save_phase_stats") as mock_phase, \
-             patch.object(app_module, "save_phase_history") as mock_hist:
-            resp1 = c.post("/api/outages/clear")
-            resp2 = c.post("/api/phase-stats/clear")
+    def test_clear_outages_and_phase_stats(self, client, stubs):
+        c, _, _ = client
+        resp1 = c.post("/api/outages/clear")
+        resp2 = c.post("/api/phase-stats/clear")
         assert resp1.status_code == 200
         assert resp2.status_code == 200
-        mock_outage.assert_called_once_with([])
-        mock_phase.assert_called_once_with({})
-        mock_hist.assert_called_once_with({})
+        stubs.save_outage_history.assert_called_once_with([])
+        stubs.save_phase_stats.assert_called_once_with({})
+        stubs.save_phase_history.assert_called_once_with({})
@@ -1,20 +1,37 @@
 """Tests for BatterySampler logic."""
 import pytest
-from unittest.mock import patch, MagicMock
+from types import SimpleNamespace
+from unittest.mock import patch
 from inverter import BatterySampler, DeyeInverter, InverterConfig
 from tests.conftest import mock_read_register
 
+_APPROX_52V = pytest.approx(52.0)
+_APPROX_53V = pytest.approx(53.0)
 
-@pytest.fixture
+
+@pytest.fixture(scope="class")
 def sampler():
-    """Create a BatterySampler with a mocked inverter."""
+    """Create a BatterySampler with a mocked inverter, shared within a test class.
+
+    BatterySampler.__init__ has no side effects; the buffers are reset
+    between tests by _reset_buffers.
+    """
     with patch("inverter.PySolarmanV5"):
         inv = DeyeInverter(ip="192.168.1.1", serial=123456)
-        inv.inverter = MagicMock()
+        # Stand-in connection: truthy so _sample() skips connect(); tests
+        # stub DeyeInverter.read_register directly
+        inv.inverter = SimpleNamespace()
         inv.config = InverterConfig(phases=3)
         return BatterySampler(inv, interval=10, buffer_size=6)
 
 
+@pytest.fixture(autouse=True)
+def _reset_buffers(sampler):
+    yield
+    sampler._buffer.clear()
+    sampler._soc_buffer.clear()
+
+
 class TestGetVoltage:
     def test_empty_buffer_returns_none(self, sampler):
         assert sampler.get_voltage() is None
@@ -25,7 +42,7 @@ class TestGetVoltage:
 
     def test_average_of_multiple(self, sampler):
         sampler._buffer = [51.0, 52.0, 53.0]
-        assert sampler.get_voltage() == pytest.approx(52.0)
+        assert sampler.get_voltage() == _APPROX_52V
 
 
 class TestGetSoc:
@@ -48,7 +65,7 @@ class TestSample:
         sampler.inverter.read_register = mock_read_register({587: 5200, 588: 75})
         sampler._sample()
         assert len(sampler._buffer) == 1
-        assert sampler._buffer[0] == pytest.approx(52.0)
+        assert sampler._buffer[0] == _APPROX_52V
         assert len(sampler._soc_buffer) == 1
         assert sampler._soc_buffer[0] == 75
 
@@ -81,7 +98,7 @@ class TestSample:
         sampler._sample()
         assert len(sampler._buffer) == 6
         assert sampler._buffer[0] == 50.5  # oldest (50.0) evicted
-        assert sampler._buffer[-1] == pytest.approx(53.0)
+        assert sampler._buffer[-1] == _APPROX_53V
 
     def test_read_failure_no_crash(self, sampler):
         """Exception during read should not propagate."""
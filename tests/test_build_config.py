@@ -3,33 +3,53 @@ import pytest
 from unittest.mock import patch, MagicMock
 from inverter import InverterConfig, DeyeInverter
 
+CONFIG_ENV_VARS = ("INVERTER_PHASES", "INVERTER_HAS_BATTERY",
+                   "INVERTER_PV_STRINGS", "INVERTER_HAS_GENERATOR")
+
+
+@pytest.fixture(scope="module")
+def _detector_inverter():
+    """One DeyeInverter for the module; each _build() swaps in a fresh detect_config."""
+    with patch("inverter.PySolarmanV5"):
+        inv = DeyeInverter(ip="192.168.1.1", serial=123456)
+    inv.inverter = MagicMock()
+    return inv
+
+
+@pytest.fixture(scope="module")
+def build_fn():
+    """app.build_inverter_config, imported once; it reads env vars per call."""
+    from app import build_inverter_config
+    return build_inverter_config
+
 
 class TestBuildInverterConfig:
+    @pytest.fixture(autouse=True)
+    def _inverter(self, _detector_inverter, build_fn, monkeypatch):
+        self.inv = _detector_inverter
+        self.build_fn = build_fn
+        self.monkeypatch = monkeypatch
+
     def _build(self, env_vars, detect_result=None, detect_raises=False):
-        """Helper that imports and calls build_inverter_config with env overrides."""
-        with patch("inverter.PySolarmanV5"):
-            inv = DeyeInverter(ip="192.168.1.1", serial=123456)
-            inv.inverter = MagicMock()
-
-            if detect_raises:
-                inv.detect_config = MagicMock(side_effect=Exception("timeout"))
-            elif detect_result:
-                inv.detect_config = MagicMock(return_value=detect_result)
-            else:
-                inv.detect_config = MagicMock(
-                    return_value=InverterConfig(phases=3, has_battery=True, pv_strings=2, has_generator=False)
-                )
-
-            with patch.dict("os.environ", env_vars, clear=False):
-                # Remove any existing env vars that might interfere
-                for key in ["INVERTER_PHASES", "INVERTER_HAS_BATTERY",
-                            "INVERTER_PV_STRINGS", "INVERTER_HAS_GENERATOR"]:
-                    if key not in env_vars:
-                        import os
-                        os.environ.pop(key, None)
-
-                from app import build_inverter_config
-                return build_inverter_config(inv), inv
+        """Helper that calls build_inverter_config with env overrides."""
+        inv = self.inv
+        if detect_raises:
+            inv.detect_config = MagicMock(side_effect=Exception("timeout"))
+        elif detect_result:
+            inv.detect_config = MagicMock(return_value=detect_result)
+        else:
+            inv.detect_config = MagicMock(
+                return_value=InverterConfig(phases=3, has_battery=True, pv_strings=2, has_generator=False)
+            )
+
+        # Remove any existing env vars that might interfere; monkeypatch
+        # restores the environment after the test
+        for key in CONFIG_ENV_VARS:
+            self.monkeypatch.delenv(key, raising=False)
+        for key, value in env_vars.items():
+            self.monkeypatch.setenv(key, value)
+
+        return self.build_fn(inv), inv
 
     def test_all_env_vars_skips_detect(self):
         env = {
@@ -92,15 +112,15 @@ class TestBuildInverterConfig:
         config, _ = self._build(env)
         assert config.has_generator is False
 
-    def test_boolean_variants(self):
+    @pytest.mark.parametrize("val", ["yes", "1", "True"])
+    def test_boolean_variants(self, val):
         """'yes', '1', 'True' should all work as truthy."""
-        for val in ("yes", "1", "True"):
-            env = {
-                "INVERTER_PHASES": "3",
-                "INVERTER_HAS_BATTERY": val,
-                "INVERTER_PV_STRINGS": "2",
-                "INVERTER_HAS_GENERATOR": val,
-            }
-            config, _ = self._build(env)
-            assert config.has_battery is True, f"Failed for {val}"
-            assert config.has_generator is True, f"Failed for {val}"
+        env = {
+            "INVERTER_PHASES": "3",
+            "INVERTER_HAS_BATTERY": val,
+            "INVERTER_PV_STRINGS": "2",
+            "INVERTER_HAS_GENERATOR": val,
+        }
+        config, _ = self._build(env)
+        assert config.has_battery is True
+        assert config.has_generator is True
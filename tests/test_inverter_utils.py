@@ -1,4 +1,5 @@
 """Tests for pure utility functions in inverter.py."""
+import pytest
 from inverter import to_signed, voltage_to_soc, InverterConfig
 
 
@@ -23,31 +24,21 @@ class TestToSigned:
 
 
 class TestVoltageToSoc:
-    def test_above_max(self):
-        assert voltage_to_soc(60.0) == 100
-
-    def test_exact_max(self):
-        assert voltage_to_soc(57.6) == 100
-
-    def test_below_min(self):
-        assert voltage_to_soc(40.0) == 0
-
-    def test_exact_min(self):
-        assert voltage_to_soc(48.0) == 0
-
-    def test_midrange(self):
+    @pytest.mark.parametrize("voltage,expected_min,expected_max", [
+        (60.0, 100, 100),
+        (57.6, 100, 100),
+        (40.0, 0, 0),
+        (48.0, 0, 0),
         # 52.0V is the (52.0, 50) point in the curve
-        assert voltage_to_soc(52.0) == 50
-
-    def test_high_interpolation(self):
+        (52.0, 50, 50),
         # Between (53.6, 90) and (53.2, 80)
-        result = voltage_to_soc(53.4)
-        assert 80 <= result <= 90
-
-    def test_low_interpolation(self):
+        (53.4, 80, 90),
         # Between (51.2, 30) and (50.4, 17)
-        result = voltage_to_soc(50.8)
-        assert 17 <= result <= 30
+        (50.8, 17, 30),
+    ], ids=["above_max", "exact_max", "below_min", "exact_min", "midrange",
+            "high_interpolation", "low_interpolation"])
+    def test_voltage_to_soc(self, voltage, expected_min, expected_max):
+        assert expected_min <= voltage_to_soc(voltage) <= expected_max
 
     def test_returns_int(self):
         assert isinstance(voltage_to_soc(52.5), int)
@@ -1,8 +1,9 @@
 """Tests for outage provider factory, HTML parsing, and schedule status."""
 import pytest
-from unittest.mock import patch
+from contextlib import contextmanager
 from datetime import datetime, timedelta
 
+import outage_providers.base as outage_base
 from outage_providers.base import create_outage_provider, OutageSchedulePoller
 from outage_providers.lvivoblenergo import LvivoblenergoProvider, parse_group_windows
 from outage_providers.yasno import YasnoProvider
@@ -32,24 +33,35 @@ class TestCreateOutageProvider:
 
 
 class TestParseGroupWindows:
-    def test_single_window(self):
-        html = "<p>Група 4.1. з 09:00 до 12:00</p>"
-        windows = parse_group_windows(html, "4.1")
-        assert windows == [(9, 0, 12, 0)]
-
-    def test_multiple_windows(self):
-        html = "<p>Група 4.1. з 09:00 до 12:00, з 18:00 до 21:00</p>"
-        windows = parse_group_windows(html, "4.1")
-        assert windows == [(9, 0, 12, 0), (18, 0, 21, 0)]
-
-    def test_group_not_found(self):
-        html = "<p>Група 3.2. з 09:00 до 12:00</p>"
-        windows = parse_group_windows(html, "4.1")
-        assert windows == []
-
-    def test_empty_html(self):
-        windows = parse_group_windows("", "4.1")
-        assert windows == []
+    @pytest.mark.parametrize("html,group,expected", [
+        ("<p>Група 4.1. з 09:00 до 12:00</p>", "4.1", [(9, 0, 12, 0)]),
+        ("<p>Група 4.1. з 09:00 до 12:00, з 18:00 до 21:00</p>", "4.1",
+         [(9, 0, 12, 0), (18, 0, 21, 0)]),
+        ("<p>Група 3.2. з 09:00 до 12:00</p>", "4.1", []),
+        ("", "4.1", []),
+    ], ids=["single_window", "multiple_windows", "group_not_found", "empty_html"])
+    def test_parse_group_windows(self, html, group, expected):
+        assert parse_group_windows(html, group) == expected
+
+
+def _frozen_datetime(dt):
+    """Return a datetime subclass whose now() always returns dt."""
+    class FrozenDatetime(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return dt
+    return FrozenDatetime
+
+
+@contextmanager
+def frozen_base_datetime(now):
+    """Freeze datetime.now() as seen by outage_providers.base."""
+    original = outage_base.datetime
+    outage_base.datetime = _frozen_datetime(now)
+    try:
+        yield
+    finally:
+        outage_base.datetime = original
 
 
 class TestOutageSchedulePollerStatus:
@@ -68,15 +80,12 @@ class TestOutageSchedulePollerStatus:
 
     def test_active_during_window(self):
         # Fixed time: 12:30, inside window 12:00-13:00
-        now = datetime.now().replace(hour=12, minute=30, second=0, microsecond=0)
+        now = datetime(2025, 1, 15, 12, 30)
         poller = self._make_poller(
             [(12, 0, 13, 0)],
             last_updated=now,
         )
-        with patch("outage_providers.base.datetime") as mock_dt:
-            mock_dt.now.return_value = now
-            mock_dt.combine = datetime.combine
-            mock_dt.min = datetime.min
+        with frozen_base_datetime(now):
             status = poller.get_outage_status()
         assert status["status"] == "active"
         assert "remaining_minutes" in status
@@ -84,54 +93,44 @@ class TestOutageSchedulePollerStatus:
 
     def test_upcoming_before_window(self):
         # Use a fixed time (10:00) so +2h doesn't cross midnight
-        now = datetime.now().replace(hour=10, minute=0, second=0, microsecond=0)
+        now = datetime(2025, 1, 15, 10, 0)
         poller = self._make_poller(
             [(12, 0, 13, 0)],  # window from 12:00-13:00
             last_updated=now,
         )
-        with patch("outage_providers.base.datetime") as mock_dt:
-            mock_dt.now.return_value = now
-            mock_dt.combine = datetime.combine
-            mock_dt.min = datetime.min
+        with frozen_base_datetime(now):
             status = poller.get_outage_status()
         assert status["status"] == "upcoming"
         assert len(status["upcoming_windows"]) == 1
 
     def test_clear_all_past(self):
         # Fixed time: 15:00, past window 8:00-10:00
-        now = datetime.now().replace(hour=15, minute=0, second=0, microsecond=0)
+        now = datetime(2025, 1, 15, 15, 0)
         poller = self._make_poller(
             [(8, 0, 10, 0)],
             last_updated=now,
         )
-        with patch("outage_providers.base.datetime") as mock_dt:
-            mock_dt.now.return_value = now
-            mock_dt.combine = datetime.combine
-            mock_dt.min = datetime.min
+        with frozen_base_datetime(now):
             status = poller.get_outage_status()
         assert status["status"] == "clear"
 
     def test_midnight_crossing(self):
         """Window (22,0,24,0) should create end_dt as next day midnight."""
-        now = datetime.now().replace(hour=22, minute=30, second=0, microsecond=0)
+        now = datetime(2025, 1, 15, 22, 30)
         poller = self._make_poller(
             [(22, 0, 24, 0)],
             last_updated=now,
         )
-        with patch("outage_providers.base.datetime") as mock_dt:
-            mock_dt.now.return_value = now
-            mock_dt.combine = datetime.combine
-            mock_dt.min = datetime.min
+        with frozen_base_datetime(now):
             status = poller.get_outage_status()
         assert status["status"] == "active"
         # end_time should be next day midnight
-        assert status["end_time"].hour == 0
-        assert status["end_time"].day == now.day + 1
+        assert status["end_time"] == datetime(2025, 1, 16, 0, 0)
 
     def test_electricity_start_tracks_last_ended_window(self):
         """electricity_start should be the end of the last past window."""
         # Fixed time: 12:00. Past window 8:00-11:00, future window 14:00-15:00
-        now = datetime.now().replace(hour=12, minute=0, second=0, microsecond=0)
+        now = datetime(2025, 1, 15, 12, 0)
         poller = self._make_poller(
             [
                 (8, 0, 11, 0),   # past window (ended at 11:00)
@@ -139,10 +138,7 @@ class TestOutageSchedulePollerStatus:
             ],
             last_updated=now,
         )
-        with patch("outage_providers.base.datetime") as mock_dt:
-            mock_dt.now.return_value = now
-            mock_dt.combine = datetime.combine
-            mock_dt.min = datetime.min
+        with frozen_base_datetime(now):
             status = poller.get_outage_status()
         assert status["status"] == "upcoming"
         assert "electricity_start" in status
@@ -151,7 +147,7 @@ class TestOutageSchedulePollerStatus:
     def test_multiple_upcoming(self):
         """All future windows should be returned in the upcoming list."""
         # Fixed time: 10:00. Two future windows at 14:00-15:00 and 18:00-19:00
-        now = datetime.now().replace(hour=10, minute=0, second=0, microsecond=0)
+        now = datetime(2025, 1, 15, 10, 0)
         poller = self._make_poller(
             [
                 (14, 0, 15, 0),
@@ -159,10 +155,7 @@ class TestOutageSchedulePollerStatus:
             ],
             last_updated=now,
         )
-        with patch("outage_providers.base.datetime") as mock_dt:
-            mock_dt.now.return_value = now
-            mock_dt.combine = datetime.combine
-            mock_dt.min = datetime.min
+        with frozen_base_datetime(now):
             status = poller.get_outage_status()
         assert status["status"] == "upcoming"
         assert len(status["upcoming_windows"]) == 2
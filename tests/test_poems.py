@@ -7,34 +7,19 @@ from poems import _weather_code_to_category, _is_night, get_poem
 
 
 class TestWeatherCodeToCategory:
-    def test_none_returns_clear(self):
-        assert _weather_code_to_category(None) == "clear"
-
-    def test_code_0_clear(self):
-        assert _weather_code_to_category(0) == "clear"
-
-    def test_code_1_2_clear(self):
-        assert _weather_code_to_category(1) == "clear"
-        assert _weather_code_to_category(2) == "clear"
-
-    def test_code_3_cloudy(self):
-        assert _weather_code_to_category(3) == "cloudy"
-
-    def test_code_45_fog(self):
-        assert _weather_code_to_category(45) == "fog"
-        assert _weather_code_to_category(48) == "fog"
-
-    def test_drizzle_range(self):
-        for code in (51, 53, 55, 57):
-            assert _weather_code_to_category(code) == "rain"
-
-    def test_snow_range(self):
-        for code in (71, 73, 75, 77):
-            assert _weather_code_to_category(code) == "snow"
-
-    def test_thunderstorm(self):
-        for code in (95, 96, 99):
-            assert _weather_code_to_category(code) == "storm"
+    @pytest.mark.parametrize("code,expected", [
+        (None, "clear"),
+        (0, "clear"), (1, "clear"), (2, "clear"),
+        (3, "cloudy"),
+        (45, "fog"), (48, "fog"),
+        # Drizzle
+        (51, "rain"), (53, "rain"), (55, "rain"), (57, "rain"),
+        (71, "snow"), (73, "snow"), (75, "snow"), (77, "snow"),
+        # Thunderstorm
+        (95, "storm"), (96, "storm"), (99, "storm"),
+    ], ids=repr)
+    def test_weather_code_to_category(self, code, expected):
+        assert _weather_code_to_category(code) == expected
 
 
 class TestGetPoem:
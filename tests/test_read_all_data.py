@@ -0,0 +1,116 @@
+"""Tests for DeyeInverter.read_all_data() register decoding."""
+import socket
+import pytest
+from unittest.mock import patch, MagicMock
+
+from pysolarmanv5 import V5FrameError
+
+from inverter import InverterConfig
+from tests.conftest import mock_read_holding_registers
+
+
+@pytest.fixture(autouse=True)
+def _no_sleep():
+    with patch("inverter.time.sleep"):
+        yield
+
+
+class TestRead3Phase:
+    REGISTERS = {
+        514: 1500, 515: 800,               # PV1/PV2
+        586: 65436, 587: 5200, 588: 75,    # battery current (-100 → 1.00A), 52.00V, 75%
+        598: 2300, 607: 65336,             # grid 230.0V, -200W
+        540: 1250, 541: 1400,              # DC 25.0C, heatsink 40.0C
+        502: 123, 520: 45, 521: 67, 526: 89,
+        644: 2290, 645: 2300, 646: 2310,   # phase voltages
+        650: 100, 651: 200, 652: 300, 653: 600,
+    }
+
+    def test_decodes_batched_registers(self, mock_inverter):
+        mock_inverter.config = InverterConfig(phases=3, has_battery=True, pv_strings=2)
+        mock_inverter.inverter.read_holding_registers.side_effect = \
+            mock_read_holding_registers(self.REGISTERS)
+        data = mock_inverter.read_all_data()
+        assert "error" not in data
+        assert data["pv_total_power"] == 2300
+        assert data["battery_voltage"] == pytest.approx(52.0)
+        assert data["battery_current"] == pytest.approx(1.0)
+        assert data["battery_soc"] == 75
+        assert data["grid_power"] == -200
+        assert data["grid_status"] == "Exporting"
+        assert data["dc_temp"] == pytest.approx(25.0)
+        assert data["heatsink_temp"] == pytest.approx(40.0)
+        assert data["daily_grid_import"] == pytest.approx(4.5)
+        assert data["daily_grid_export"] == pytest.approx(6.7)
+        assert (data["load_l1"], data["load_l2"], data["load_l3"]) == (100, 200, 300)
+        assert data["load_power"] == 600
+        assert data["voltage_l3"] == pytest.approx(231.0)
+
+    def test_contiguous_registers_read_in_one_request(self, mock_inverter):
+        mock_inverter.config = InverterConfig(phases=3, has_battery=True, pv_strings=2)
+        modbus = mock_inverter.inverter
+        modbus.read_holding_registers.side_effect = \
+            mock_read_holding_registers(self.REGISTERS)
+        mock_inverter.read_all_data()
+        calls = [c.args for c in modbus.read_holding_registers.call_args_list]
+        assert (586, 3) in calls
+        assert (650, 4) in calls
+        assert len(calls) == 10
+
+
+class TestRead1Phase:
+    def test_decodes_sunsynk_registers(self, mock_inverter):
+        mock_inverter.config = InverterConfig(phases=1, has_battery=True, pv_strings=1)
+        mock_inverter.inverter.read_holding_registers.side_effect = \
+            mock_read_holding_registers({
+                186: 900, 183: 5100, 184: 60, 191: 200,
+                150: 2280, 169: 150, 176: 700, 178: 750,
+                76: 12, 77: 3,
+            })
+        data = mock_inverter.read_all_data()
+        assert "error" not in data
+        assert data["pv_total_power"] == 900
+        assert data["battery_voltage"] == pytest.approx(51.0)
+        assert data["battery_current"] == pytest.approx(-2.0)
+        assert data["battery_soc"] == 60
+        assert data["load_l1"] == 700
+        assert data["load_power"] == 750
+        assert data["daily_grid_import"] == pytest.approx(1.2)
+
+
+class TestConnectionHandling:
+    def test_connection_kept_open_after_poll(self, mock_inverter):
+        modbus = mock_inverter.inverter
+        modbus.read_holding_registers.side_effect = mock_read_holding_registers({})
+        mock_inverter.read_all_data()
+        assert mock_inverter.inverter is modbus
+        modbus.disconnect.assert_not_called()
+
+    def test_reconnects_and_retries_once_on_timeout(self, mock_inverter):
+        broken = mock_inverter.inverter
+        broken.read_holding_registers.side_effect = socket.timeout("timed out")
+        fresh = MagicMock()
+        fresh.read_holding_registers.side_effect = mock_read_holding_registers({514: 700})
+        with patch("inverter.PySolarmanV5", return_value=fresh):
+            data = mock_inverter.read_all_data()
+        assert "error" not in data
+        assert data["pv1_power"] == 700
+        broken.disconnect.assert_called_once()
+        assert mock_inverter.inverter is fresh
+
+    def test_gives_up_after_second_connection_error(self, mock_inverter):
+        with patch("inverter.PySolarmanV5") as factory:
+            factory.return_value.read_holding_registers.side_effect = ConnectionResetError("reset")
+            mock_inverter.inverter.read_holding_registers.side_effect = ConnectionResetError("reset")
+            data = mock_inverter.read_all_data()
+        assert data["error"] == "reset"
+        assert factory.call_count == 1
+        assert mock_inverter.inverter is None
+
+    def test_frame_error_keeps_connection(self, mock_inverter):
+        modbus = mock_inverter.inverter
+        modbus.read_holding_registers.side_effect = V5FrameError("bad checksum")
+        data = mock_inverter.read_all_data()
+        assert "bad checksum" in data["error"]
+        modbus.disconnect.assert_not_called()
+        assert mock_inverter.inverter is modbus
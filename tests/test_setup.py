@@ -1,6 +1,7 @@
 """Tests for setup.py load_existing_env and write_env."""
 import os
 import pytest
+from pathlib import Path
 
 from setup import load_existing_env, write_env
 
@@ -57,7 +58,7 @@ class TestWriteEnv:
             "TELEGRAM_ENABLED": "false",
         }
         write_env(values, [], path=env_file)
-        content = open(env_file).read()
+        content = Path(env_file).read_text()
         assert "INVERTER_IP=192.168.1.100" in content
         assert "LOGGER_SERIAL=12345" in content
         assert "OUTAGE_PROVIDER=lvivoblenergo" in content
@@ -74,7 +75,7 @@ class TestWriteEnv:
             "GENERATOR_FUEL_RATE": "2.5",
         }
         write_env(values, [], path=env_file)
-        content = open(env_file).read()
+        content = Path(env_file).read_text()
         assert "INVERTER_HAS_GENERATOR=true" in content
         assert "GENERATOR_FUEL_RATE=2.5" in content
         assert "# Generator" in content
@@ -89,7 +90,7 @@ class TestWriteEnv:
             "INVERTER_HAS_GENERATOR": "false",
         }
         write_env(values, [], path=env_file)
-        content = open(env_file).read()
+        content = Path(env_file).read_text()
         assert "INVERTER_HAS_GENERATOR" not in content
         assert "# Generator" not in content
 
@@ -103,7 +104,15 @@ class TestWriteEnv:
         }
         extra = ["DEPLOY_HOST=server.example.com", "DEPLOY_USER=admin"]
         write_env(values, extra, path=env_file)
-        content = open(env_file).read()
+        content = Path(env_file).read_text()
         assert "# Additional settings" in content
         assert "DEPLOY_HOST=server.example.com" in content
         assert "DEPLOY_USER=admin" in content
+
+    def test_file_is_owner_only(self, tmp_path):
+        env_file = tmp_path / ".env"
+        env_file.write_text("OLD=1\n")
+        env_file.chmod(0o644)
+        write_env({"TELEGRAM_ENABLED": "false"}, [], path=str(env_file))
+        assert env_file.stat().st_mode & 0o777 == 0o600
+        assert "OLD=1" not in env_file.read_text()
@@ -1,11 +1,21 @@
 """Tests for OTA update manager."""
 import json
 import pytest
-from unittest.mock import patch, MagicMock, PropertyMock
+from unittest.mock import patch, MagicMock
 
+import update_manager
 from update_manager import get_current_version, UpdatePoller, UpdateManager
 
 
+@pytest.fixture(autouse=True)
+def _fresh_version_cache():
+    update_manager.invalidate_version_cache()
+    update_manager._requirements_diff.cache_clear()
+    yield
+    update_manager.invalidate_version_cache()
+    update_manager._requirements_diff.cache_clear()
+
+
 class TestGetCurrentVersion:
     def test_returns_tag(self):
         mock_result = MagicMock(returncode=0, stdout="v1.2.0\n")
@@ -17,6 +27,13 @@ class TestGetCurrentVersion:
         with patch("update_manager.subprocess.run", return_value=mock_result):
             assert get_current_version() == "unknown"
 
+    def test_caches_version(self):
+        mock_result = MagicMock(returncode=0, stdout="v1.2.0\n")
+        with patch("update_manager.subprocess.run", return_value=mock_result) as mock_run:
+            assert get_current_version() == "v1.2.0"
+            assert get_current_version() == "v1.2.0"
+        mock_run.assert_called_once()
+
     def test_returns_unknown_on_exception(self):
         with patch("update_manager.subprocess.run", side_effect=Exception("fail")):
             assert get_current_version() == "unknown"
@@ -33,7 +50,7 @@ class TestUpdatePoller:
             {"name": "v1.1.0"},
         ]
 
-        with patch("update_manager.requests.get", return_value=mock_resp), \
+        with patch("update_manager.requests.Session.get", return_value=mock_resp), \
              patch("update_manager.get_current_version", return_value="v1.2.0"):
             poller._fetch()
 
@@ -49,34 +66,175 @@ class TestUpdatePoller:
         mock_resp.ok = True
         mock_resp.json.return_value = [{"name": "v1.2.0"}]
 
-        with patch("update_manager.requests.get", return_value=mock_resp), \
+        with patch("update_manager.requests.Session.get", return_value=mock_resp), \
              patch("update_manager.get_current_version", return_value="v1.2.0"):
             poller._fetch()
 
         data = poller.data
         assert data["update_available"] is False
 
+    @pytest.mark.parametrize("tags,current,latest,available", [
+        (["v1.9.0", "v1.10.0"], "v1.9.0", "v1.10.0", True),
+        (["v1.1.0"], "v1.10.0", "v1.1.0", False),
+        (["v1.2.0"], "v1.2.0-3-gabc1234", "v1.2.0", False),
+        (["nightly", "v1.3.0"], "v1.2.0", "v1.3.0", True),
+    ])
+    def test_fetch_compares_versions_numerically(self, tags, current, latest, available):
+        poller = UpdatePoller(repo="owner/repo")
+        mock_resp = MagicMock(ok=True)
+        mock_resp.json.return_value = [{"name": t} for t in tags]
+
+        with patch("update_manager.requests.Session.get", return_value=mock_resp), \
+             patch("update_manager.get_current_version", return_value=current):
+            poller._fetch()
+
+        data = poller.data
+        assert data["latest_tag"] == latest
+        assert data["update_available"] is available
+        assert data["available_tags"] == tags
+
+    def test_fetch_streams_tag_names_with_ijson(self):
+        ijson = pytest.importorskip("ijson")
+        import io
+        poller = UpdatePoller(repo="owner/repo")
+        mock_resp = MagicMock(ok=True, status_code=200, headers={})
+        mock_resp.raw = io.BytesIO(
+            b'[{"name": "v1.3.0", "commit": {"sha": "a"}}, {"name": "v1.2.0"}]')
+
+        with patch("update_manager.ijson", ijson), \
+             patch("update_manager.requests.Session.get", return_value=mock_resp), \
+             patch("update_manager.get_current_version", return_value="v1.2.0"):
+            poller._fetch()
+
+        mock_resp.json.assert_not_called()
+        assert poller.data["available_tags"] == ["v1.3.0", "v1.2.0"]
+
     def test_fetch_handles_api_error(self):
         poller = UpdatePoller(repo="owner/repo")
         mock_resp = MagicMock()
         mock_resp.ok = False
         mock_resp.status_code = 403
 
-        with patch("update_manager.requests.get", return_value=mock_resp):
+        with patch("update_manager.requests.Session.get", return_value=mock_resp):
             poller._fetch()
 
         assert poller.data is None
 
+    def test_fetch_sends_etag_and_keeps_cache_on_304(self):
+        poller = UpdatePoller(repo="owner/repo")
+        first = MagicMock(ok=True, status_code=200,
+                          headers={"ETag": '"abc"', "X-RateLimit-Remaining": "59"})
+        first.json.return_value = [{"name": "v1.3.0"}]
+        not_modified = MagicMock(ok=True, status_code=304,
+                                 headers={"X-RateLimit-Remaining": "59"})
+
+        with patch("update_manager.requests.Session.get",
+                   side_effect=[first, not_modified]) as mock_get, \
+             patch("update_manager.get_current_version", return_value="v1.2.0"):
+            poller._fetch()
+            checked = poller.data["last_checked"]
+            poller._last_fetch_monotonic = 0.0  # outside the grace window
+            poller._fetch()
+
+        assert mock_get.call_args.kwargs["headers"] == {"If-None-Match": '"abc"'}
+        not_modified.json.assert_not_called()
+        data = poller.data
+        assert data["available_tags"] == ["v1.3.0"]
+        assert data["last_checked"] >= checked
+
+    def test_304_recomputes_version_from_cached_tags(self):
+        poller = UpdatePoller(repo="owner/repo")
+        first = MagicMock(ok=True, status_code=200, headers={"ETag": '"abc"'})
+        first.json.return_value = [{"name": "v1.3.0"}]
+        not_modified = MagicMock(ok=True, status_code=304, headers={})
+
+        with patch("update_manager.requests.Session.get",
+                   side_effect=[first, not_modified]), \
+             patch("update_manager.get_current_version",
+                   side_effect=["v1.2.0", "v1.3.0"]):
+            poller._fetch()
+            assert poller.data["update_available"] is True
+            poller._last_fetch_monotonic = 0.0
+            poller._fetch()
+
+        data = poller.data
+        assert data["current_version"] == "v1.3.0"
+        assert data["update_available"] is False
+        assert data["available_tags"] == ["v1.3.0"]
+
+    def test_unparseable_body_does_not_keep_validators(self):
+        poller = UpdatePoller(repo="owner/repo")
+        bad = MagicMock(ok=True, status_code=200, headers={"ETag": '"abc"'})
+        bad.json.return_value = {"message": "oops"}
+        good = MagicMock(ok=True, status_code=200, headers={})
+        good.json.return_value = [{"name": "v1.3.0"}]
+
+        with patch("update_manager.requests.Session.get",
+                   side_effect=[bad, good]) as mock_get, \
+             patch("update_manager.get_current_version", return_value="v1.2.0"):
+            poller._fetch()
+            assert poller.data is None
+            poller._fetch()
+
+        assert mock_get.call_args.kwargs["headers"] == {}
+        assert poller.data["latest_tag"] == "v1.3.0"
+
+    def test_fetch_reuses_result_within_grace_window(self):
+        poller = UpdatePoller(repo="owner/repo")
+        mock_resp = MagicMock(ok=True)
+        mock_resp.json.return_value = [{"name": "v1.3.0"}]
+        with patch("update_manager.requests.Session.get", return_value=mock_resp) as mock_get, \
+             patch("update_manager.get_current_version", return_value="v1.2.0"):
+            poller._fetch()
+            poller._fetch()
+        mock_get.assert_called_once()
+
+    def test_fetch_retries_immediately_after_error(self):
+        poller = UpdatePoller(repo="owner/repo")
+        with patch("update_manager.requests.Session.get",
+                   side_effect=Exception("timeout")) as mock_get:
+            poller._fetch()
+            poller._fetch()
+        assert mock_get.call_count == 2
+
+    def test_low_rate_limit_skips_next_poll(self):
+        poller = UpdatePoller(repo="owner/repo")
+        resp = MagicMock(ok=False, status_code=403,
+                         headers={"X-RateLimit-Remaining": "0"})
+        with patch("update_manager.requests.Session.get", return_value=resp):
+            poller._fetch()
+        assert poller._skip_next_poll is True
+
     def test_fetch_handles_exception(self):
         poller = UpdatePoller(repo="owner/repo")
-        with patch("update_manager.requests.get", side_effect=Exception("timeout")):
+        with patch("update_manager.requests.Session.get", side_effect=Exception("timeout")):
             poller._fetch()
         assert poller.data is None
 
+    def test_session_reused_with_github_headers(self):
+        with patch("update_manager.get_current_version", return_value="v1.2.0"):
+            poller = UpdatePoller(repo="owner/repo")
+        assert poller._session.headers["User-Agent"] == "deye-dashboard/v1.2.0"
+        assert poller._session.headers["Accept"] == "application/vnd.github+json"
+        adapter = poller._session.get_adapter("https://api.github.com/")
+        assert adapter.max_retries.total == 2
+
     def test_data_returns_none_before_fetch(self):
         poller = UpdatePoller(repo="owner/repo")
         assert poller.data is None
 
+    def test_data_is_shared_read_only_snapshot(self):
+        poller = UpdatePoller(repo="owner/repo")
+        mock_resp = MagicMock(ok=True)
+        mock_resp.json.return_value = [{"name": "v1.3.0"}]
+        with patch("update_manager.requests.Session.get", return_value=mock_resp), \
+             patch("update_manager.get_current_version", return_value="v1.2.0"):
+            poller._fetch()
+
+        assert poller.data is poller.data
+        with pytest.raises(TypeError):
+            poller.data["latest_tag"] = "v9.9.9"
+
     def test_force_check_triggers_fetch(self):
         poller = UpdatePoller(repo="owner/repo")
         with patch.object(poller, "_fetch") as mock_fetch:
@@ -84,6 +242,53 @@ class TestUpdatePoller:
                 poller.force_check()
                 mock_thread.assert_called_once()
 
+    def test_force_check_wakes_running_poller(self):
+        poller = UpdatePoller(repo="owner/repo")
+        poller._thread = MagicMock()
+        poller._thread.is_alive.return_value = True
+        with patch("update_manager.threading.Thread") as mock_thread:
+            poller.force_check()
+        mock_thread.assert_not_called()
+        assert poller._wake.is_set()
+
+    def test_poll_interval_backs_off_until_new_tag(self):
+        poller = UpdatePoller(repo="owner/repo", poll_interval=600)
+        tags = iter(["v1.0.0", "v1.0.0", "v1.0.0", "v1.1.0"])
+
+        def fake_fetch():
+            poller._cache = {"latest_tag": next(tags)}
+
+        with patch.object(poller, "_fetch", side_effect=fake_fetch):
+            waits = [poller._poll_once() for _ in range(4)]
+        assert waits == [600, 1200, 2400, 600]
+
+    def test_poll_interval_capped_and_reset_by_force_check(self):
+        poller = UpdatePoller(repo="owner/repo", poll_interval=600)
+        poller._miss_streak = 30
+        with patch.object(poller, "_fetch"):
+            assert poller._poll_once() == update_manager.MAX_POLL_INTERVAL
+        with patch("update_manager.threading.Thread"):
+            poller.force_check()
+        assert poller._miss_streak == 0
+
+    def test_forced_poll_waits_base_interval(self):
+        poller = UpdatePoller(repo="owner/repo", poll_interval=600)
+        poller._cache = {"latest_tag": "v1.0.0"}
+        poller._miss_streak = 3
+        poller._thread = MagicMock()
+        poller._thread.is_alive.return_value = True
+        poller.force_check()
+        with patch.object(poller, "_fetch"):
+            assert poller._poll_once(forced=True) == 600
+            assert poller._poll_once() == 1200
+
+    def test_fetch_skips_when_check_in_flight(self):
+        poller = UpdatePoller(repo="owner/repo")
+        poller._in_flight.acquire()
+        with patch("update_manager.requests.Session.get") as mock_get:
+            poller._fetch()
+        mock_get.assert_not_called()
+
 
 class TestUpdateManager:
     def test_is_git_repo_true(self):
@@ -118,6 +323,30 @@ class TestUpdateManager:
         assert ok is True
         assert issues == []
 
+    def test_preflight_runs_single_git_call(self):
+        mgr = UpdateManager()
+        with patch("update_manager.subprocess.run",
+                   return_value=MagicMock(returncode=0)) as mock_run, \
+             patch("update_manager.os.path.isdir", return_value=True):
+            mgr.preflight_check()
+        git_calls = [c for c in mock_run.call_args_list if c.args[0][0] == "git"]
+        assert len(git_calls) == 1
+
+    def test_preflight_reports_sudo_issue(self):
+        mgr = UpdateManager()
+
+        def side_effect(cmd, **kwargs):
+            if cmd[0] == "sudo":
+                return MagicMock(returncode=1, stderr=b"sudo: a password is required")
+            return MagicMock(returncode=0)
+
+        with patch("update_manager.subprocess.run", side_effect=side_effect), \
+             patch("update_manager.os.path.isdir", return_value=True):
+            ok, issues = mgr.preflight_check()
+
+        assert ok is False
+        assert issues == ["sudo systemctl not configured (passwordless)"]
+
     def test_preflight_no_git(self):
         mgr = UpdateManager()
         with patch("update_manager.subprocess.run", side_effect=FileNotFoundError):
@@ -125,22 +354,91 @@ class TestUpdateManager:
         assert ok is False
         assert "git is not installed" in issues
 
+    @staticmethod
+    def _git_diff_exits(code, tag_shas=("def456",)):
+        tag_shas = iter(tag_shas)
+
+        def side_effect(cmd, **kwargs):
+            if cmd[1] == "rev-parse":
+                return MagicMock(returncode=0, stdout=f"abc123\n{next(tag_shas)}\n")
+            return MagicMock(returncode=code)
+        return side_effect
+
     def test_requirements_changed(self):
         mgr = UpdateManager()
-        mock_result = MagicMock(returncode=0, stdout="requirements.txt\n")
-        with patch("update_manager.subprocess.run", return_value=mock_result):
+        with patch("update_manager.subprocess.run", side_effect=self._git_diff_exits(1)):
             assert mgr._requirements_changed("v1.3.0") is True
 
     def test_requirements_unchanged(self):
         mgr = UpdateManager()
-        mock_result = MagicMock(returncode=0, stdout="")
-        with patch("update_manager.subprocess.run", return_value=mock_result):
+        with patch("update_manager.subprocess.run", side_effect=self._git_diff_exits(0)):
             assert mgr._requirements_changed("v1.3.0") is False
 
+    def test_requirements_assumed_changed_on_git_error(self):
+        mgr = UpdateManager()
+        with patch("update_manager.subprocess.run", side_effect=self._git_diff_exits(128)):
+            assert mgr._requirements_changed("v9.9.9") is True
+        assert update_manager._requirements_diff.cache_info().currsize == 0
+
+    def test_requirements_diff_cached_per_head(self):
+        mgr = UpdateManager()
+        with patch("update_manager.subprocess.run",
+                   side_effect=self._git_diff_exits(1, ["def456", "def456"])) as mock_run:
+            assert mgr._requirements_changed("v1.3.0") is True
+            assert mgr._requirements_changed("v1.3.0") is True
+        rev_parse = mock_run.call_args_list[0].args[0]
+        assert rev_parse == ["git", "rev-parse", "HEAD", "v1.3.0^{commit}"]
+        diff_calls = [c for c in mock_run.call_args_list if c.args[0][1] == "diff"]
+        assert len(diff_calls) == 1
+        assert diff_calls[0].args[0][3:5] == ["abc123", "def456"]
+
+    def test_requirements_rechecked_when_tag_moves(self):
+        mgr = UpdateManager()
+        with patch("update_manager.subprocess.run",
+                   side_effect=self._git_diff_exits(0, ["def456", "fed789"])) as mock_run:
+            mgr._requirements_changed("v1.3.0")
+            mgr._requirements_changed("v1.3.0")
+        diff_calls = [c for c in mock_run.call_args_list if c.args[0][1] == "diff"]
+        assert [c.args[0][4] for c in diff_calls] == ["def456", "fed789"]
+
+    @pytest.mark.parametrize("single_fetch_rc,expected_fetches", [
+        (0, [["git", "fetch", "--no-tags", "--force", "origin",
+              "refs/tags/v1.3.0:refs/tags/v1.3.0"]]),
+        (1, [["git", "fetch", "--no-tags", "--force", "origin",
+              "refs/tags/v1.3.0:refs/tags/v1.3.0"],
+             ["git", "fetch", "--tags", "--force"]]),
+    ])
+    def test_fetch_tag_falls_back_to_all_tags(self, single_fetch_rc, expected_fetches):
+        mgr = UpdateManager()
+
+        def side_effect(cmd, **kwargs):
+            if "refs/tags/v1.3.0:refs/tags/v1.3.0" in cmd:
+                return MagicMock(returncode=single_fetch_rc, stderr="")
+            return MagicMock(returncode=0, stderr="")
+
+        with patch("update_manager.subprocess.run", side_effect=side_effect) as mock_run:
+            assert mgr._fetch_tag("v1.3.0").returncode == 0
+        assert [c.args[0] for c in mock_run.call_args_list] == expected_fetches
+
     def test_status_default_idle(self):
         mgr = UpdateManager()
         assert mgr.status["state"] == "idle"
 
+    def test_set_status_swaps_read_only_view(self):
+        mgr = UpdateManager()
+        mgr._set_status("updating", "Fetching tags...")
+        assert mgr.status is mgr.status
+        assert mgr.status["state"] == "updating"
+        assert mgr.status["message"] == "Fetching tags..."
+        assert mgr.status["timestamp"] is not None
+        with pytest.raises(TypeError):
+            mgr.status["state"] = "idle"
+
+    def test_update_status_record_is_frozen(self):
+        record = update_manager.UpdateStatus("idle", "", None, None)
+        with pytest.raises(AttributeError):
+            record.state = "updating"
+
     def test_update_to_tag_rejects_concurrent(self):
         mgr = UpdateManager()
         mgr._lock.acquire()
@@ -163,7 +461,9 @@ class TestOtaApiEndpoints:
         orig_inverter_config = app_module.inverter_config
         orig_update_poller = app_module.update_poller
         orig_update_manager = app_module.update_manager
+        orig_configured = app_module._configured
 
+        app_module._configured = True
         mock_inv_poller = MagicMock()
         mock_weather_poller = MagicMock()
 
@@ -179,21 +479,22 @@ class TestOtaApiEndpoints:
         app_module.inverter_config = orig_inverter_config
         app_module.update_poller = orig_update_poller
         app_module.update_manager = orig_update_manager
+        app_module._configured = orig_configured
 
     def test_update_status_returns_version(self, client):
         c, app_module = client
         mock_poller = MagicMock()
-        type(mock_poller).data = PropertyMock(return_value={
+        mock_poller.data = {
             "current_version": "v1.0.0",
             "latest_tag": "v1.1.0",
             "update_available": True,
             "available_tags": ["v1.1.0", "v1.0.0"],
             "last_checked": "2025-01-01T00:00:00",
-        })
+        }
         mock_mgr = MagicMock()
-        type(mock_mgr).status = PropertyMock(return_value={
+        mock_mgr.status = {
             "state": "idle", "message": "", "error": None, "timestamp": None,
-        })
+        }
         mock_mgr.is_git_repo.return_value = True
         app_module.update_poller = mock_poller
         app_module.update_manager = mock_mgr
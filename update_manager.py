@@ -2,92 +2,338 @@
 
 Polls GitHub for new tagged releases and manages git-based updates.
 """
+import functools
+import itertools
 import logging
 import os
+import re
 import subprocess
 import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from datetime import datetime
+from types import MappingProxyType
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
 
 logger = logging.getLogger(__name__)
 
+_HERE = os.path.dirname(os.path.abspath(__file__))
+_VENV_DIR = os.path.join(_HERE, "venv")
+_VENV_PIP = os.path.join(_VENV_DIR, "bin", "pip")
+
+# Skip the next poll when fewer unauthenticated GitHub API requests remain
+RATE_LIMIT_RESERVE = 5
+
+# Tags requested per check (GitHub returns newest refs first)
+TAGS_PER_PAGE = 20
+
+# A check within this many seconds of the last successful one reuses its result
+# (e.g. several dashboard tabs pressing "check for updates" together)
+FETCH_GRACE_SECONDS = 60
+
+# Upper bound for the poll interval while no new tags appear
+MAX_POLL_INTERVAL = 6 * 3600
+
+# How long git lookups (version, work tree check) are reused before re-running git
+GIT_CACHE_TTL = 30
+
+_VER_RE = re.compile(r"v?(\d+)\.(\d+)\.(\d+)")
+
+_version_cache = None  # (monotonic timestamp, version)
+_version_lock = threading.Lock()
+
 
 def get_current_version():
-    """Get the current version from git describe --tags --always."""
+    """Get the current version from git describe --tags --always.
+
+    Successful lookups are cached for GIT_CACHE_TTL seconds, so the status
+    endpoint and the poller don't fork git on every call.
+    """
+    global _version_cache
+    with _version_lock:
+        if _version_cache and time.monotonic() - _version_cache[0] < GIT_CACHE_TTL:
+            return _version_cache[1]
     try:
         result = subprocess.run(
             ["git", "describe", "--tags", "--always"],
             capture_output=True, text=True, timeout=10,
         )
         if result.returncode == 0:
-            return result.stdout.strip()
+            version = result.stdout.strip()
+            with _version_lock:
+                _version_cache = (time.monotonic(), version)
+            return version
     except Exception:
         logger.debug("Failed to get git version")
     return "unknown"
 
 
+def _parse_ver(s):
+    """Parse 'v1.2.3' (or 'v1.2.3-4-gabcdef' from git describe) into (1, 2, 3).
+
+    Returns None for names that aren't semantic versions.
+    """
+    m = _VER_RE.match(s)
+    return tuple(int(g) for g in m.groups()) if m else None
+
+
+def _read_tag_names(resp):
+    """Extract tag names from a GitHub tags API response.
+
+    With ijson installed the body is stream-parsed and only the "name" fields
+    are built; otherwise the whole array is decoded. Returns None when the
+    response isn't a list.
+    """
+    if ijson is not None:
+        resp.raw.decode_content = True
+        return list(itertools.islice(ijson.items(resp.raw, "item.name"), TAGS_PER_PAGE))
+    tags = resp.json()
+    if not isinstance(tags, list):
+        return None
+    return [n for n in (t.get("name") for t in tags) if n]
+
+
+@functools.lru_cache(maxsize=32)
+def _requirements_diff(head_sha, tag_sha):
+    """Whether requirements.txt differs between commits head_sha and tag_sha.
+
+    Keyed on resolved commits, so a tag re-pointed by a forced fetch is a new
+    key; errors propagate and are not cached.
+    """
+    # --quiet answers through the exit code: 0 = same, 1 = differs
+    result = subprocess.run(
+        ["git", "diff", "--quiet", head_sha, tag_sha, "--", "requirements.txt"],
+        stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL, timeout=10,
+    )
+    if result.returncode not in (0, 1):
+        raise RuntimeError(f"git diff exited with {result.returncode}")
+    return result.returncode == 1
+
+
+def invalidate_version_cache():
+    """Forget the cached version, e.g. after checking out another tag."""
+    global _version_cache
+    with _version_lock:
+        _version_cache = None
+
+
 class UpdatePoller:
     """Polls GitHub API for new tagged releases."""
 
     def __init__(self, repo, poll_interval=600):
         self.repo = repo
         self.poll_interval = poll_interval
-        self._cache = {}
+        # Read-only snapshot, replaced wholesale on each check so readers never copy
+        self._cache = MappingProxyType({})
         self._lock = threading.Lock()
+        # Validators from the last 200 response, sent back as a conditional
+        # request; a 304 reply has no body and doesn't count against the rate limit
+        self._etag = None
+        self._last_modified = None
+        self._skip_next_poll = False
+        self._wake = threading.Event()
+        self._in_flight = threading.Lock()
+        self._thread = None
+        self._miss_streak = 0  # consecutive polls with no new latest tag
+        self._last_fetch_monotonic = 0.0  # last successful check, for FETCH_GRACE_SECONDS
+        # One pooled keep-alive connection to api.github.com, reused across polls
+        self._session = requests.Session()
+        self._session.mount("https://", HTTPAdapter(
+            pool_connections=1, pool_maxsize=2,
+            max_retries=Retry(total=2, backoff_factor=0.3,
+                              status_forcelist=(502, 503, 504), raise_on_status=False),
+        ))
+        self._session.headers.update({
+            "Accept": "application/vnd.github+json",
+            "User-Agent": f"deye-dashboard/{get_current_version()}",
+        })
+
+    def _check_rate_limit(self, resp):
+        """Flag the next poll to be skipped if the API rate limit is nearly used up."""
+        try:
+            remaining = int(resp.headers.get("X-RateLimit-Remaining"))
+        except (TypeError, ValueError):
+            return
+        if remaining < RATE_LIMIT_RESERVE:
+            logger.warning("GitHub API rate limit nearly exhausted (%d left), skipping next check",
+                           remaining)
+            self._skip_next_poll = True
 
     def _fetch(self):
+        # Overlapping checks (force_check while a poll is running) collapse into one
+        if not self._in_flight.acquire(blocking=False):
+            return
+        try:
+            self._fetch_tags()
+        finally:
+            self._in_flight.release()
+
+    def _build_result(self, tag_names):
+        """Compare tag_names against the running version into a check result."""
+        current = get_current_version()
+
+        # Compare numerically so v1.10.0 sorts above v1.9.0
+        parsed = []
+        for name in tag_names:
+            ver = _parse_ver(name)
+            if ver:
+                parsed.append((ver, name))
+        parsed.sort(reverse=True)
+        cur_ver = _parse_ver(current)
+        if parsed:
+            latest = parsed[0][1]
+        else:
+            latest = tag_names[0] if tag_names else None
+
+        update_available = False
+        if latest and current != "unknown":
+            if parsed and cur_ver:
+                update_available = parsed[0][0] > cur_ver
+            else:
+                update_available = latest != current and not current.startswith(latest)
+
+        return {
+            "current_version": current,
+            "latest_tag": latest,
+            "update_available": update_available,
+            "available_tags": tag_names,
+            "last_checked": datetime.now().isoformat(),
+        }
+
+    def _store_result(self, result):
+        snapshot = MappingProxyType(result)
+        with self._lock:
+            self._cache = snapshot
+        self._last_fetch_monotonic = time.monotonic()
+
+    def _fetch_tags(self):
+        if self._cache and time.monotonic() - self._last_fetch_monotonic < FETCH_GRACE_SECONDS:
+            return
+        resp = None
         try:
             url = f"https://api.github.com/repos/{self.repo}/tags"
-            resp = requests.get(url, timeout=15, params={"per_page": 20})
+            headers = {}
+            if self._etag:
+                headers["If-None-Match"] = self._etag
+            if self._last_modified:
+                headers["If-Modified-Since"] = self._last_modified
+            resp = self._session.get(url, timeout=15, params={"per_page": TAGS_PER_PAGE},
+                                     headers=headers, stream=ijson is not None)
+            self._check_rate_limit(resp)
+            if resp.status_code == 304:
+                # Tags unchanged since the last check; the current version may
+                # still have moved (update applied, version cache invalidated)
+                cached = self._cache
+                if not cached:
+                    # Validators without a snapshot to go with them; start over
+                    self._etag = self._last_modified = None
+                    return
+                self._store_result(self._build_result(list(cached["available_tags"])))
+                logger.debug("Update check: tags unchanged")
+                return
             if not resp.ok:
                 logger.warning("GitHub tags API returned %s", resp.status_code)
                 return
-            tags = resp.json()
-            if not isinstance(tags, list):
+            etag = resp.headers.get("ETag")
+            last_modified = resp.headers.get("Last-Modified")
+            tag_names = _read_tag_names(resp)
+            if tag_names is None:
                 logger.warning("Unexpected GitHub API response format")
+                self._etag = self._last_modified = None
                 return
-
-            tag_names = [t["name"] for t in tags if "name" in t]
-            current = get_current_version()
-            latest = tag_names[0] if tag_names else None
-
-            update_available = False
-            if latest and current != "unknown":
-                update_available = latest != current and not current.startswith(latest)
-
-            result = {
-                "current_version": current,
-                "latest_tag": latest,
-                "update_available": update_available,
-                "available_tags": tag_names,
-                "last_checked": datetime.now().isoformat(),
-            }
-            with self._lock:
-                self._cache = result
+            result = self._build_result(tag_names)
+            self._store_result(result)
+            # Only now that the snapshot matches this response are its
+            # validators safe to send back
+            self._etag = etag
+            self._last_modified = last_modified
             logger.info("Update check: current=%s latest=%s update_available=%s",
-                        current, latest, update_available)
+                        result["current_version"], result["latest_tag"],
+                        result["update_available"])
         except Exception:
             logger.exception("Error checking for updates")
+            # The body may have been half-read; don't let a 304 pin that state
+            self._etag = self._last_modified = None
+        finally:
+            if resp is not None:
+                resp.close()
 
     @property
     def data(self):
-        with self._lock:
-            return dict(self._cache) if self._cache else None
+        """Latest check result as a read-only mapping, or None before the first check.
+
+        The lock only guards swapping the snapshot; reading the attribute is atomic.
+        """
+        return self._cache or None
 
     def force_check(self):
-        """Trigger an immediate update check in a background thread."""
-        threading.Thread(target=self._fetch, daemon=True).start()
+        """Trigger an immediate update check in a background thread.
+
+        Wakes the polling thread if it's running, otherwise runs a one-off check.
+        """
+        self._miss_streak = 0
+        if self._thread is not None and self._thread.is_alive():
+            self._wake.set()
+        else:
+            threading.Thread(target=self._fetch, daemon=True).start()
+
+    def _poll_once(self, forced=False):
+        """Run one check and return how long to wait before the next.
+
+        Releases are days apart, so each scheduled poll that finds the same
+        latest tag doubles the wait, up to MAX_POLL_INTERVAL. A new tag resets
+        it; a check woken by force_check() leaves its reset streak alone.
+        """
+        if self._skip_next_poll:
+            self._skip_next_poll = False
+        else:
+            before = self._cache.get("latest_tag")
+            self._fetch()
+            if self._cache.get("latest_tag") != before:
+                self._miss_streak = 0
+            elif not forced:
+                self._miss_streak += 1
+        wait = self.poll_interval * 2 ** min(self._miss_streak, 16)
+        return min(wait, max(MAX_POLL_INTERVAL, self.poll_interval))
 
     def _run(self):
+        forced = False
         while True:
-            self._fetch()
-            time.sleep(self.poll_interval)
+            # wait() returns True when force_check() set the event
+            forced = self._wake.wait(self._poll_once(forced))
+            self._wake.clear()
 
     def start(self):
-        t = threading.Thread(target=self._run, daemon=True)
-        t.start()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+
+@dataclass(frozen=True)
+class UpdateStatus:
+    """One state of an update run."""
+    __slots__ = ("state", "message", "error", "timestamp")
+    state: str
+    message: str
+    error: object
+    timestamp: object
+
+    def to_dict(self):
+        return {
+            "state": self.state,
+            "message": self.message,
+            "error": self.error,
+            "timestamp": self.timestamp,
+        }
 
 
 class UpdateManager:
@@ -95,86 +341,128 @@ class UpdateManager:
 
     def __init__(self):
         self._lock = threading.Lock()
-        self._status = {
-            "state": "idle",
-            "message": "",
-            "error": None,
-            "timestamp": None,
-        }
-        self._status_lock = threading.Lock()
+        self._git_repo_cache = None  # (monotonic timestamp, bool)
+        self._store_status(UpdateStatus("idle", "", None, None))
 
     @property
     def status(self):
-        with self._status_lock:
-            return dict(self._status)
+        """Current status as a read-only dict, built once per status change."""
+        return self._status_dict
+
+    def _store_status(self, status):
+        # Written from the update thread and from request threads (update_to_tag
+        # rejecting a concurrent run). No lock is needed: the view is built in
+        # full first and _status_dict is the only attribute rebound, in a single
+        # atomic assignment, so a reader sees one complete status or the next
+        self._status_dict = MappingProxyType(status.to_dict())
 
     def _set_status(self, state, message="", error=None):
-        with self._status_lock:
-            self._status = {
-                "state": state,
-                "message": message,
-                "error": error,
-                "timestamp": datetime.now().isoformat(),
-            }
+        self._store_status(UpdateStatus(state, message, error, datetime.now().isoformat()))
+
+    def _check_git_repo(self):
+        """Run git rev-parse once, caching the answer for GIT_CACHE_TTL seconds.
+
+        Raises FileNotFoundError if git is not installed.
+        """
+        cached = self._git_repo_cache
+        if cached and time.monotonic() - cached[0] < GIT_CACHE_TTL:
+            return cached[1]
+        # Only the exit code matters
+        result = subprocess.run(
+            ["git", "rev-parse", "--is-inside-work-tree"],
+            stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL, timeout=5,
+        )
+        is_repo = result.returncode == 0
+        self._git_repo_cache = (time.monotonic(), is_repo)
+        return is_repo
 
     def is_git_repo(self):
         """Check if the current directory is a git repository."""
         try:
-            result = subprocess.run(
-                ["git", "rev-parse", "--is-inside-work-tree"],
-                capture_output=True, text=True, timeout=5,
-            )
-            return result.returncode == 0
+            return self._check_git_repo()
         except Exception:
             return False
 
-    def preflight_check(self):
-        """Run preflight checks before update. Returns (ok, issues_list)."""
-        issues = []
-
-        # Check git is installed
-        try:
-            subprocess.run(["git", "--version"], capture_output=True, timeout=5)
-        except FileNotFoundError:
-            issues.append("git is not installed")
-            return False, issues
-
-        # Check is git repo
-        if not self.is_git_repo():
-            issues.append("Not a git repository")
-            return False, issues
-
-        # Check venv exists
-        venv_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "venv")
-        if not os.path.isdir(venv_path):
-            issues.append("Virtual environment (venv) not found")
-
-        # Check sudo systemctl works
+    def _check_sudo(self):
+        """Probe passwordless sudo systemctl. Returns an issue string or None."""
         try:
             result = subprocess.run(
                 ["sudo", "-n", "systemctl", "is-active", "--quiet", "deye-dashboard"],
-                capture_output=True, timeout=5,
+                stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL,
+                stderr=subprocess.PIPE, timeout=5,
             )
             # returncode 0 = active, 3 = inactive; both are fine (sudo works)
             # returncode 1 with stderr about sudo = sudo not configured
             if result.returncode not in (0, 3) and b"sudo" in (result.stderr or b""):
-                issues.append("sudo systemctl not configured (passwordless)")
+                return "sudo systemctl not configured (passwordless)"
         except Exception:
-            issues.append("Cannot run sudo systemctl")
+            return "Cannot run sudo systemctl"
+        return None
+
+    def preflight_check(self):
+        """Run preflight checks before update. Returns (ok, issues_list)."""
+        issues = []
+
+        # The sudo probe doesn't depend on the git checks; run it alongside them
+        # so the wall time is the slower of the two rather than their sum
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            sudo_issue = pool.submit(self._check_sudo)
+
+            # A single rev-parse covers both "git is installed" and "is git repo"
+            try:
+                is_repo = self._check_git_repo()
+            except FileNotFoundError:
+                issues.append("git is not installed")
+                return False, issues
+            except Exception:
+                is_repo = False
+            if not is_repo:
+                issues.append("Not a git repository")
+                return False, issues
+
+            # Check venv exists
+            if not os.path.isdir(_VENV_DIR):
+                issues.append("Virtual environment (venv) not found")
+
+            # Check sudo systemctl works
+            issue = sudo_issue.result()
+            if issue:
+                issues.append(issue)
 
         return len(issues) == 0, issues
 
     def _requirements_changed(self, tag):
         """Check if requirements.txt differs between current HEAD and target tag."""
         try:
+            # Resolve both ends in one call; the tag may have just been moved
             result = subprocess.run(
-                ["git", "diff", "--name-only", "HEAD", tag, "--", "requirements.txt"],
-                capture_output=True, text=True, timeout=10,
+                ["git", "rev-parse", "HEAD", f"{tag}^{{commit}}"],
+                capture_output=True, text=True, timeout=5,
             )
-            return "requirements.txt" in result.stdout
+            shas = result.stdout.split()
+            if result.returncode != 0 or len(shas) != 2:
+                return True
+            return _requirements_diff(shas[0], shas[1])
         except Exception:
             return True  # assume changed if we can't check
 
+    def _fetch_tag(self, tag):
+        """Fetch just the requested tag, falling back to fetching all tags."""
+        # Not --depth=1: on a full clone that would turn the checkout shallow
+        result = subprocess.run(
+            ["git", "fetch", "--no-tags", "--force", "origin",
+             f"refs/tags/{tag}:refs/tags/{tag}"],
+            capture_output=True, text=True, timeout=60,
+        )
+        if result.returncode == 0:
+            return result
+        logger.info("Fetching tag %s alone failed, fetching all tags", tag)
+        return subprocess.run(
+            ["git", "fetch", "--tags", "--force"],
+            capture_output=True, text=True, timeout=60,
+        )
+
     def update_to_tag(self, tag):
         """Start an update to the specified tag in a background thread."""
         if not self._lock.acquire(blocking=False):
@@ -185,13 +473,9 @@ class UpdateManager:
 
     def _do_update(self, tag):
         try:
-            self._set_status("updating", f"Fetching tags...")
+            self._set_status("updating", f"Fetching {tag}...")
 
-            # Fetch all tags
-            result = subprocess.run(
-                ["git", "fetch", "--tags", "--force"],
-                capture_output=True, text=True, timeout=60,
-            )
+            result = self._fetch_tag(tag)
             if result.returncode != 0:
                 self._set_status("error", error=f"git fetch failed: {result.stderr.strip()}")
                 return
@@ -209,15 +493,14 @@ class UpdateManager:
             if result.returncode != 0:
                 self._set_status("error", error=f"git checkout failed: {result.stderr.strip()}")
                 return
+            invalidate_version_cache()
+            _requirements_diff.cache_clear()
 
             # Install requirements if changed
             if needs_pip:
                 self._set_status("updating", "Installing updated dependencies...")
-                venv_pip = os.path.join(
-                    os.path.dirname(os.path.abspath(__file__)), "venv", "bin", "pip"
-                )
                 result = subprocess.run(
-                    [venv_pip, "install", "-r", "requirements.txt"],
+                    [_VENV_PIP, "install", "-r", "requirements.txt"],
                     capture_output=True, text=True, timeout=120,
                 )
                 if result.returncode != 0:
@@ -228,7 +511,8 @@ class UpdateManager:
             self._set_status("restarting", f"Restarting service after update to {tag}...")
             subprocess.run(
                 ["sudo", "systemctl", "restart", "deye-dashboard"],
-                capture_output=True, timeout=15,
+                stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL, timeout=15,
             )
             # If we get here, the restart hasn't killed us yet
             self._set_status("idle", f"Updated to {tag}")